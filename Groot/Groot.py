@@ -1,15 +1,38 @@
 import os
 from dotenv import load_dotenv
-import json
-import requests
-from pinecone import Pinecone, ServerlessSpec  # Add ServerlessSpec import
+import asyncio
+import contextvars
+import io
 import logging
 import time
-from typing import List, Dict, Any, Optional, Union
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union, TextIO, Callable, Iterable, Iterator
 from pathlib import Path
 
-from google import genai
-from google.genai import types
+try:
+    from .embedding_cache import EmbeddingCache
+    from .chunker import iterChunks, estimateTokens, CHARS_PER_TOKEN
+    from .chunk_store import ChunkStore, chunkID, splitChunkID
+    from .vector_store import VectorStore, PineconeVectorStore, LocalVectorStore
+    from .sessions import SessionStore, DEFAULT_SESSION
+    from .microbatch import MicroBatcher
+    from .lexical_index import LexicalIndex, reciprocalRankFusion
+    from .context import assembleContext
+    from .metrics import timed, stageLatency, TraceIDFilter
+    from .providers import Provider, CircuitBreaker
+except ImportError:
+    from embedding_cache import EmbeddingCache
+    from chunker import iterChunks, estimateTokens, CHARS_PER_TOKEN
+    from chunk_store import ChunkStore, chunkID, splitChunkID
+    from vector_store import VectorStore, PineconeVectorStore, LocalVectorStore
+    from sessions import SessionStore, DEFAULT_SESSION
+    from microbatch import MicroBatcher
+    from lexical_index import LexicalIndex, reciprocalRankFusion
+    from context import assembleContext
+    from metrics import timed, stageLatency, TraceIDFilter
+    from providers import Provider, CircuitBreaker
 
 # Load environment variables
 load_dotenv()
@@ -26,233 +49,572 @@ try:
     # API Configuration
     api_timeout = int(get_required_env("API_TIMEOUT", "30"))
     api_retry_count = int(get_required_env("API_RETRY_COUNT", "3"))
+    circuit_failure_threshold = int(get_required_env("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    circuit_reset_timeout = int(get_required_env("CIRCUIT_RESET_TIMEOUT", "30"))  # Seconds before a trial call is allowed
     
     # DeepSeek Configuration
-    deepseek_api_key = get_required_env("DEEPSEEK_API_KEY")
+    deepseek_api_key = os.environ.get("DEEPSEEK_API_KEY")
     deepseek_model = get_required_env("DEEPSEEK_MODEL", "deepseek-chat")
     deepseek_embedding_model = get_required_env("DEEPSEEK_EMBEDDING_MODEL", "deepseek-embedding")
 
-    gemini_api_key = get_required_env("GEMINI_API_KEY")
+    gemini_api_key = os.environ.get("GEMINI_API_KEY")  # Checked when the Gemini client is first created
     gemini_model = get_required_env("GEMINI_MODEL", "gemini-2.0-flash")
     gemini_embedding_model = get_required_env("GEMINI_EMBEDDING_MODEL", "text-embedding-004")
+    embed_batch_size = int(get_required_env("EMBED_BATCH_SIZE", "100"))  # Gemini accepts up to 100 contents per request
+    embed_concurrency = int(get_required_env("EMBED_CONCURRENCY", "4"))
+    embedding_cache_size = int(get_required_env("EMBEDDING_CACHE_SIZE", "10000"))
+    embedding_cache_path = get_required_env("EMBEDDING_CACHE_PATH", "Dataset/EmbeddingCache.sqlite")
+    embedding_cache_disk_size = int(get_required_env("EMBEDDING_CACHE_DISK_SIZE", "200000"))  # Rows kept in the SQLite tier
+    chunk_max_tokens = int(get_required_env("CHUNK_MAX_TOKENS", "125"))
+    chunk_overlap_tokens = int(get_required_env("CHUNK_OVERLAP_TOKENS", "16"))
+    chunk_store_path = get_required_env("CHUNK_STORE_PATH", "Dataset/SourceMapping.sqlite")
+    ingest_window_size = int(get_required_env("INGEST_WINDOW_SIZE", "256"))  # Chunks embedded and upserted together
+    io_workers = int(get_required_env("GROOT_IO_WORKERS", "32"))  # Blocking provider calls in flight for async callers
+    query_batch_window_ms = float(get_required_env("QUERY_BATCH_WINDOW_MS", "5"))  # How long a query waits for others to batch with
+    query_batch_max = int(get_required_env("QUERY_BATCH_MAX", "32"))  # 1 disables query micro-batching
+    retrieval_top_k = int(get_required_env("RETRIEVAL_TOP_K", "5"))
+
+    # Hybrid retrieval: BM25 keyword search fused with the vector search
+    lexical_search = get_required_env("LEXICAL_SEARCH", "true").lower() == "true"
+    lexical_confidence = float(get_required_env("LEXICAL_CONFIDENCE", "1.5"))  # Best keyword hit must outscore the next by this factor to skip embedding
+
+    # Context assembly: how much reference text goes into each prompt
+    context_token_budget = int(get_required_env("CONTEXT_TOKEN_BUDGET", "1500"))
+    context_mmr_lambda = float(get_required_env("CONTEXT_MMR_LAMBDA", "0.7"))  # 1 ranks purely by relevance, lower values favour diversity
+    context_duplicate_threshold = float(get_required_env("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))  # Shingle overlap at which chunks count as duplicates
+
+    # Chat history configuration
+    chat_history_turns = int(get_required_env("CHAT_HISTORY_TURNS", "4"))
+    chat_max_sessions = int(get_required_env("CHAT_MAX_SESSIONS", "10000"))
+    chat_session_ttl = int(get_required_env("CHAT_SESSION_TTL", "3600"))  # Seconds of inactivity before a session is dropped
     
     # Pinecone Configuration
-    pinecone_api_key = get_required_env("PINECONE_API_KEY")
+    pinecone_api_key = os.environ.get("PINECONE_API_KEY")  # Checked when the Pinecone client is first created
     pinecone_index_name = get_required_env("PINECONE_INDEX_NAME", "hack-iiitv-index")
     pinecone_environment = get_required_env("PINECONE_ENVIRONMENT", "us-west-2")
+    upsert_batch_size = int(get_required_env("PINECONE_UPSERT_BATCH_SIZE", "100"))
+
+    # Vector index backend: "pinecone" or "local" (in-process NumPy index)
+    vector_backend = get_required_env("VECTOR_BACKEND", "pinecone").lower()
+    local_vector_path = get_required_env("LOCAL_VECTOR_PATH", "Dataset/Vectors")
+    embedding_dimension = int(get_required_env("EMBEDDING_DIMENSION", "768"))  # Match Gemini's embedding dimension
 except ValueError as e:
     logging.error(str(e))
     raise
 
 # Configure logging
+_log_handlers = [
+    logging.FileHandler('groot.log', delay=True),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.addFilter(TraceIDFilter())  # Tags each line with the API request it belongs to
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('groot.log'),
-        logging.StreamHandler()
-    ]
+    format='%(asctime)s - %(levelname)s - [%(trace_id)s] %(message)s',
+    handlers=_log_handlers
 )
 
-# Initialize chat history
-chat = [
-    {"role": "system", "content": "You are Groot, a RAG enhanced Large Language Model. You are like a virtual professor that can regularly learn new things. You are now not restricted to your training dataset. The RAG system will provide you with the reference information you need to answer question which are beyond your knowledge. If you get a Reference Information Along with the prompt, you need to use the given information along with your existing knowledge base (more emphasis on the provided reference). Your purpose is to provide the most accurate and relevant information to the student and help them in their learning journey."},
-]
+SYSTEM_PROMPT = "You are Groot, a RAG enhanced Large Language Model. You are like a virtual professor that can regularly learn new things. You are now not restricted to your training dataset. The RAG system will provide you with the reference information you need to answer question which are beyond your knowledge. If you get a Reference Information Along with the prompt, you need to use the given information along with your existing knowledge base (more emphasis on the provided reference). Your purpose is to provide the most accurate and relevant information to the student and help them in their learning journey."
+
+# Vector namespaces by access level; the default namespace holds vectors written before the split
+PUBLIC_NAMESPACE = "public"
+RESTRICTED_NAMESPACE = "restricted"
+LEGACY_NAMESPACE = ""
+
+# Returned by generateResponse when the model call fails
+RESPONSE_ERROR_MESSAGE = "I apologize, but I encountered an error while generating the response. Please try again."
+
+# Initialize chat history, one bounded conversation per session ID
+chatSessions = SessionStore(SYSTEM_PROMPT, max_turns=chat_history_turns, max_sessions=chat_max_sessions, ttl=chat_session_ttl)
+
+def _geminiClient():
+    # The SDKs are imported here rather than at module level; google.genai alone takes most of a second to import
+    from google import genai
+    from google.genai import types
+
+    if not gemini_api_key:
+        raise ValueError("Missing required environment variable: GEMINI_API_KEY")
+    return genai.Client(api_key=gemini_api_key, http_options=types.HttpOptions(timeout=api_timeout * 1000))
+
+def _pineconeClient():
+    from pinecone import Pinecone
+
+    if not pinecone_api_key:
+        raise ValueError("Missing required environment variable: PINECONE_API_KEY")
+    return Pinecone(api_key=pinecone_api_key)
+
+# Shared provider clients with retry/backoff, circuit breaking and latency stats.
+# Clients are created on first use (or by warmup()) and reused for every call.
+geminiProvider = Provider(
+    "gemini",
+    _geminiClient,
+    retries=api_retry_count, timeout=api_timeout,
+    breaker=CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout, name="gemini")
+)
+pineconeProvider = Provider(
+    "pinecone",
+    _pineconeClient,
+    retries=api_retry_count, timeout=api_timeout,
+    breaker=CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout, name="pinecone")
+)
+
+# Chunk texts by chunk ID; opened on first use and seeded from the legacy SourceMapping.json
+sourceMapping = ChunkStore(chunk_store_path, legacy_path="Dataset/SourceMapping.json")
 
-# Initialize Pinecone with retry mechanism
-def initialize_pinecone(max_retries: int = api_retry_count, delay: int = 2) -> Pinecone:
-    for attempt in range(max_retries):
+# BM25 index over the chunk texts, built from sourceMapping on the first keyword search
+lexicalIndex = LexicalIndex(sourceMapping.records)
+
+# Vector index backend, created on first use
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+_migration_lock = threading.Lock()
+# Set once migrateNamespaces has confirmed the chunk store's restricted flags
+_namespaces_checked = False
+
+# Bounded executor that runs blocking Gemini/vector store calls for the async API
+_io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="groot-io")
+
+# Embeddings keyed by (model, text), in memory and on disk
+embeddingCache = EmbeddingCache(embedding_cache_path, max_entries=embedding_cache_size,
+                                max_disk_entries=embedding_cache_disk_size)
+
+# Callbacks run after new content is ingested, e.g. to invalidate answer caches
+_ingest_listeners: List[Callable[[str], None]] = []
+
+# Throughput of the batched embedding stage
+embeddingStats = {"chunks": 0, "batches": 0, "seconds": 0.0, "last_chunks_per_sec": 0.0}
+_embedding_stats_lock = threading.Lock()  # embedBatch runs on many threads at once
+
+# How queries were answered: keyword hits alone, or keyword and vector results fused
+retrievalStats = {"queries": 0, "lexical_only": 0}
+_retrieval_stats_lock = threading.Lock()  # Several query batches run at once
+
+def onIngest(callback: Callable[[str], None]) -> None:
+    """Register a callback that receives the file name whenever content is ingested"""
+    _ingest_listeners.append(callback)
+
+def _notifyIngest(file: str) -> None:
+    for callback in _ingest_listeners:
         try:
-            pc = Pinecone(
-                api_key=pinecone_api_key
-            )
-            logging.info("Pinecone initialized successfully")
-            return pc
+            callback(file)
         except Exception as e:
-            if attempt == max_retries - 1:
-                logging.error(f"Failed to initialize Pinecone after {max_retries} attempts: {str(e)}")
-                raise
-            logging.warning(f"Attempt {attempt + 1} failed, retrying in {delay} seconds...")
-            time.sleep(delay)
+            logging.error(f"Ingest listener failed: {str(e)}")
 
-# Initialize Pinecone client
-pc = initialize_pinecone()
+def getVectorStore() -> VectorStore:
+    """Return the configured vector index backend, creating it on first use"""
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                if vector_backend == "local":
+                    _vector_store = LocalVectorStore(local_vector_path, embedding_dimension)
+                elif vector_backend == "pinecone":
+                    _vector_store = PineconeVectorStore(pineconeProvider, pinecone_index_name, embedding_dimension, pinecone_environment,
+                                                        batch_size=upsert_batch_size, ready_timeout=api_timeout)
+                else:
+                    raise ValueError(f"Unknown VECTOR_BACKEND: {vector_backend}")
+                logging.info(f"Using {vector_backend} vector store")
+    return _vector_store
 
-# Load source mapping with proper error handling
-def load_source_mapping() -> Dict[str, str]:
-    try:
-        os.makedirs("Dataset", exist_ok=True)
-        mapping_file = Path("Dataset/SourceMapping.json")
-        if mapping_file.exists():
-            with open(mapping_file, "r") as f:
-                source_mapping = json.load(f)
-            logging.info("Source mapping loaded successfully")
-            return source_mapping
-        else:
-            logging.warning("SourceMapping.json not found, creating empty mapping")
-            source_mapping = {}
-            with open(mapping_file, "w") as f:
-                json.dump({}, f)
-            return source_mapping
-    except Exception as e:
-        logging.error(f"Error loading source mapping: {str(e)}")
-        raise
+def _warmVectorStore() -> None:
+    store = getVectorStore()
+    store.ensure()
+    if isinstance(store, PineconeVectorStore):
+        store.index()
+
+def _namespace(restricted: bool) -> str:
+    return RESTRICTED_NAMESPACE if restricted else PUBLIC_NAMESPACE
+
+def _visibleNamespaces(unrestricted: bool) -> List[str]:
+    """Namespaces a query may search; unrestricted mode only sees unrestricted chunks"""
+    return [PUBLIC_NAMESPACE] if unrestricted else [PUBLIC_NAMESPACE, RESTRICTED_NAMESPACE]
+
+def _chunkMetadata(chunk_id: str, restricted: bool) -> Dict[str, Any]:
+    return {"restricted": restricted, "source": splitChunkID(chunk_id)[0]}
 
-sourceMapping = load_source_mapping()
+def migrateNamespaces() -> int:
+    """Move vectors written before the index was partitioned out of the default namespace
+    and into the namespace of their access level. Returns the number of vectors moved."""
+    global _namespaces_checked
+    with _migration_lock:
+        store = getVectorStore()
+        store.ensure()
+        if not store.namespace_sizes().get(LEGACY_NAMESPACE):
+            _namespaces_checked = True
+            return 0
+
+        moved = 0
+        start = time.perf_counter()
+        records = sourceMapping.records()
+        while True:
+            batch = list(islice(records, upsert_batch_size))
+            if not batch:
+                break
+            vectors = store.fetch([chunk_id for chunk_id, _, _ in batch], namespace=LEGACY_NAMESPACE)
+            # The flag stored with each vector decides its namespace. Chunks imported from the legacy
+            # SourceMapping.json have no flag of their own (they are stored as restricted), so the
+            # vector's flag is written back to the chunk store; a vector without one stays restricted.
+            stored = {chunk_id: flag for chunk_id, _, flag in batch}
+            restricted = {vector["id"]: bool(vector["metadata"].get("restricted", stored[vector["id"]])) for vector in vectors}
+            sourceMapping.set_restricted(restricted)
+            for flag in (False, True):
+                lexicalIndex.add(((chunk_id, text) for chunk_id, text, _ in batch if restricted.get(chunk_id) == flag), flag)
+            for flag in (False, True):
+                group = [
+                    {"id": vector["id"], "values": vector["values"], "metadata": _chunkMetadata(vector["id"], flag)}
+                    for vector in vectors if restricted[vector["id"]] == flag
+                ]
+                if group:
+                    store.upsert(group, namespace=_namespace(flag))
+            store.delete([vector["id"] for vector in vectors], namespace=LEGACY_NAMESPACE)
+            moved += len(vectors)
+        logging.info(f"Moved {moved} vectors into access-level namespaces in {time.perf_counter() - start:.2f}s")
+        _namespaces_checked = True
+        return moved
+
+def warmup() -> Dict[str, str]:
+    """Open the local stores, create the provider clients and the vector index handle ahead of the first request.
+    Every step is attempted even when an earlier one fails; returns 'ok' or the error for each step."""
+    steps = {
+        "chunk_store": sourceMapping.open,
+        "embedding_cache": embeddingCache.open,
+        "gemini": geminiProvider.warmup,
+        "vector_store": _warmVectorStore,
+        "vector_namespaces": migrateNamespaces,
+    }
+    status = {}
+    start = time.perf_counter()
+    for name, step in steps.items():
+        try:
+            step()
+            status[name] = "ok"
+        except Exception as e:
+            logging.warning(f"Warmup of {name} failed: {str(e)}")
+            status[name] = f"error: {str(e)}"
+    logging.info(f"Warmup finished in {time.perf_counter() - start:.2f}s")
+    return status
 
-def getChunks(data: str, size: int = 500) -> List[str]:
-    """Split data into chunks of specified size"""
+def providerStats() -> Dict[str, Dict[str, Any]]:
+    """Circuit state and latency percentiles for each upstream provider"""
+    return {provider.name: provider.stats() for provider in (geminiProvider, pineconeProvider)}
+
+def getChunks(data: str, size: int = chunk_max_tokens * CHARS_PER_TOKEN) -> List[str]:
+    """Split data into chunks of at most size characters along sentence and paragraph boundaries"""
     if not data:
         return []
-    chunks = [data[i:i+size] for i in range(0, len(data), size)]
-    return chunks
+    return list(iterChunks(io.StringIO(data), max_tokens=max(1, size // CHARS_PER_TOKEN), overlap_tokens=chunk_overlap_tokens))
 
-def embedText(chunk: str, max_retries: int = api_retry_count) -> List[float]:
-    """Create embeddings for text using DeepSeek API"""
-    for attempt in range(1):
-        try:
+def streamChunks(stream: TextIO, max_tokens: int = chunk_max_tokens, overlap_tokens: int = chunk_overlap_tokens):
+    """Lazily chunk a text stream (e.g. an open file) with the configured budget"""
+    return iterChunks(stream, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
 
-            # headers = {
-            #     "Authorization": f"Bearer {deepseek_api_key}",
-            #     "Content-Type": "application/json"
-            # }
-            
-            # data = {
-            #     "input": chunk,
-            #     "model": deepseek_embedding_model
-            # }
-            
-            # response = requests.post(
-            #     "https://api.deepseek.com/v1/embeddings",
-            #     headers=headers,
-            #     json=data,
-            #     timeout=api_timeout
-            # )
-
-            # print("**********chunk = ", chunk)
-
-            client = genai.Client(api_key = gemini_api_key)
-            
-            response = client.models.embed_content(
-                model=gemini_embedding_model,
-                contents=chunk
-            )
-            
-            
-            if not response:
-                logging.error(f"DeepSeek API error: {response.text}")
-                raise Exception(f"DeepSeek API error: {response.text}")
-            
-            
-                
-            result = response.embeddings[0].values
+def _embedContent(contents: Union[str, List[str]], expected: int) -> List[List[float]]:
+    """Call embed_content through the Gemini provider and check the number of embeddings returned"""
+    def request(client) -> List[List[float]]:
+        response = client.models.embed_content(
+            model=gemini_embedding_model,
+            contents=contents
+        )
+        if not response or not response.embeddings:
+            raise Exception("No embedding data received from Gemini API")
+        if len(response.embeddings) != expected:
+            raise Exception(f"Gemini API returned {len(response.embeddings)} embeddings for {expected} inputs")
+        return [embedding.values for embedding in response.embeddings]
 
-            if not result:
-                raise Exception("No embedding data received from Gemini API")
+    return geminiProvider.call(request)
+
+def embedText(chunk: str) -> List[float]:
+    """Create embeddings for text using the Gemini API"""
+    cached = embeddingCache.get(gemini_embedding_model, chunk)
+    if cached is not None:
+        return cached
 
-            return result
-        
-        except Exception as e:
-            if attempt == max_retries - 1:
-                logging.error(f"Error creating embedding after {max_retries} attempts: {str(e)}")
-                raise
-            logging.warning(f"Embedding attempt {attempt + 1} failed, retrying...")
-            time.sleep(1)
-
-def storeEmbeddings(embeddings: List[List[float]], chunks: List[str], file: str, unrestricted: bool) -> None:
-    """Store embeddings in Pinecone"""
-    if not embeddings or not chunks:
-        logging.warning("No embeddings or chunks to store")
-        return
-        
-    vectors = []
-    file = file.split(".")[0]
-    
-    # Get the last chunk ID or start from 0
-    try:
-        lastChunkID = int(str(list(sourceMapping.keys())[-1])[-1]) if sourceMapping else 0
-    except (IndexError, ValueError):
-        lastChunkID = 0
-    
-    # Create index if it doesn't exist
     try:
-        if pinecone_index_name in pc.list_indexes().names():
-            pc.delete_index(pinecone_index_name)
-            logging.info(f"Deleted existing Pinecone index: {pinecone_index_name}")
-            time.sleep(5)  # Wait for deletion to complete
-            
-        pc.create_index(
-            name=pinecone_index_name,
-            dimension=768,  # Match Gemini's embedding dimension
-            metric='cosine',
-            spec=ServerlessSpec(
-                cloud='aws',
-                region=pinecone_environment
-            )
-        )
-        logging.info(f"Created new Pinecone index: {pinecone_index_name}")
-        # Wait for index to be ready
-        time.sleep(5)
+        with timed("embed"):
+            result = _embedContent(chunk, 1)[0]
     except Exception as e:
-        logging.error(f"Error managing Pinecone index: {str(e)}")
+        logging.error(f"Error creating embedding: {str(e)}")
         raise
-    
-    # Get index
+
+    embeddingCache.put(gemini_embedding_model, chunk, result)
+    return result
+
+def _embedBatchRequest(batch: List[str]) -> List[List[float]]:
+    """Embed one batch of chunks with a single embed_content request"""
     try:
-        index = pc.Index(pinecone_index_name)
+        return _embedContent(batch, len(batch))
     except Exception as e:
-        logging.error(f"Error accessing Pinecone index: {str(e)}")
+        logging.error(f"Error creating batch embedding: {str(e)}")
         raise
-    
-    # Prepare vectors for upsert
+
+def embedBatch(chunks: List[str], batch_size: int = embed_batch_size, max_workers: int = embed_concurrency) -> List[List[float]]:
+    """Create embeddings for many chunks, several chunks per request and a bounded number of requests at once.
+    Embeddings are returned in the same order as the chunks."""
+    if not chunks:
+        return []
+
+    # Only chunks missing from the cache are sent, each distinct text once
+    embeddings = embeddingCache.get_many(gemini_embedding_model, chunks)
+    pending = list(dict.fromkeys(chunk for chunk, embedding in zip(chunks, embeddings) if embedding is None))
+    if not pending:
+        logging.info(f"All {len(chunks)} chunk embeddings served from cache")
+        return embeddings
+
+    batches = [pending[i:i+batch_size] for i in range(0, len(pending), batch_size)]
+    start = time.perf_counter()
+
+    # executor.map yields results in submission order, which keeps chunk order intact
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        results = list(executor.map(_embedBatchRequest, batches))
+
+    elapsed = time.perf_counter() - start
+    fresh = [embedding for batch in results for embedding in batch]
+    embeddingCache.put_many(gemini_embedding_model, pending, fresh)
+
+    computed = dict(zip(pending, fresh))
+    embeddings = [embedding if embedding is not None else computed[chunk] for chunk, embedding in zip(chunks, embeddings)]
+
+    rate = len(pending) / elapsed if elapsed > 0 else float("inf")
+    with _embedding_stats_lock:
+        embeddingStats["chunks"] += len(pending)
+        embeddingStats["batches"] += len(batches)
+        embeddingStats["seconds"] += elapsed
+        embeddingStats["last_chunks_per_sec"] = rate
+    logging.info(f"Embedded {len(pending)} chunks in {len(batches)} batches ({rate:.1f} chunks/sec), {len(chunks) - len(pending)} from cache")
+    return embeddings
+
+def _fileKey(file: str) -> str:
+    """Name a file's chunks are stored under: its full file name, so 'notes.txt',
+    'notes.md' and 'Notes.txt' stay apart"""
+    return Path(file).name
+
+def _legacyFileKey(file: str) -> str:
+    # Chunks used to be stored under the lowercased name without its extension
+    return Path(file).stem.lower()
+
+def fileChunkSeqs(file: str) -> List[int]:
+    """Return the chunk sequence numbers currently stored for a file"""
+    return sourceMapping.file_seqs(_fileKey(file))
+
+def ensureIndex() -> None:
+    """Create the vector index if it is missing and wait until it is ready"""
+    getVectorStore().ensure()
+
+def _upsertChunks(store: VectorStore, embeddings: List[List[float]], chunks: List[str], file: str, start: int, unrestricted: bool) -> None:
+    """Upsert chunks with IDs start, start+1, ... for a file into the namespace of their access level and record their text"""
+    restricted = not unrestricted
+    vectors = []
     for i, embedding in enumerate(embeddings):
-        chunk_id = f"{file.lower()}_chunk_{lastChunkID+i+1}"
-        row = {
-            'id': chunk_id,
+        vectors.append({
+            'id': chunkID(file, start + i),
             'values': embedding,
-            "metadata": {"restricted": not unrestricted}
-        }
-        vectors.append(row)
-    
-    # Update source mapping
-    for i, chunk in enumerate(chunks):
-        sourceMapping[f"{file.lower()}_chunk_{lastChunkID+i+1}"] = chunk
-    
-    # Save source mapping
+            "metadata": {"restricted": restricted, "source": file}
+        })
+
+    # Chunks re-ingested under the other access level must leave their old namespace
+    previous = sourceMapping.restricted_many([vector['id'] for vector in vectors])
+    moved = [chunk_id for chunk_id, flag in previous.items() if flag != restricted]
+
+    sourceMapping.put_many(file, start, chunks, restricted)
+    lexicalIndex.add(((vector['id'], chunk) for vector, chunk in zip(vectors, chunks)), restricted)
+
     try:
-        with open("Dataset/SourceMapping.json", "w") as f:
-            json.dump(sourceMapping, f)
-        logging.info("Source mapping updated successfully")
+        store.upsert(vectors, namespace=_namespace(restricted))
+        logging.info(f"Upserted {len(vectors)} embeddings to the {_namespace(restricted)} namespace")
+        if moved:
+            store.delete(moved, namespace=_namespace(not restricted))
     except Exception as e:
-        logging.error(f"Error saving source mapping: {str(e)}")
+        logging.error(f"Error upserting to the vector store: {str(e)}")
         raise
-    
-    # Upsert vectors to Pinecone
+
+def _deleteChunks(store: VectorStore, file: str, seqs: List[int]) -> None:
+    """Remove chunks of a file from the vector store and the chunk store"""
+    if not seqs:
+        return
+    ids = [chunkID(file, seq) for seq in seqs]
+    flags = sourceMapping.restricted_many(ids)
     try:
-        index.upsert(vectors=vectors)
-        logging.info(f"Upserted {len(vectors)} embeddings to Pinecone")
+        for restricted in (False, True):
+            group = [chunk_id for chunk_id in ids if flags.get(chunk_id) == restricted]
+            if group:
+                store.delete(group, namespace=_namespace(restricted))
+        logging.info(f"Deleted {len(ids)} stale chunks of {file} from the vector store")
     except Exception as e:
-        logging.error(f"Error upserting to Pinecone: {str(e)}")
+        logging.error(f"Error deleting from the vector store: {str(e)}")
         raise
+    sourceMapping.delete(ids)
+    lexicalIndex.remove(ids)
+
+def _deleteLegacyChunks(store: VectorStore, file: str) -> bool:
+    """Remove chunks stored under the file's old stem-based key when the file is replaced.
+    That key was shared by every file with the same stem, so it holds the chunks of
+    whichever of them was ingested last. Returns whether any were removed."""
+    legacy = _legacyFileKey(file)
+    seqs = sourceMapping.file_seqs(legacy) if legacy != file else []
+    _deleteChunks(store, legacy, seqs)
+    return bool(seqs)
+
+def storeEmbeddings(embeddings: List[List[float]], chunks: List[str], file: str, unrestricted: bool, mode: str = "replace") -> None:
+    """Store embeddings in Pinecone.
+
+    mode="replace" overwrites the file's chunks and removes any left over from
+    a longer previous version; mode="append" adds chunks after the file's
+    existing ones. Chunks of other files are never touched.
+    """
+    if not embeddings or not chunks:
+        logging.warning("No embeddings or chunks to store")
+        return
+    if mode not in ("replace", "append"):
+        raise ValueError(f"Unknown ingestion mode: {mode}")
+
+    file = _fileKey(file)
+    existing = sourceMapping.file_seqs(file)
+
+    # Chunk IDs are allocated per file: {file}_chunk_1, {file}_chunk_2, ...
+    if mode == "append":
+        start = existing[-1] + 1 if existing else 1
+        stale = []
+    else:
+        start = 1
+        stale = [seq for seq in existing if seq > len(chunks)]
+
+    store = getVectorStore()
+    store.ensure()
+
+    _upsertChunks(store, embeddings, chunks, file, start, unrestricted)
+    _deleteChunks(store, file, stale)
+    if mode == "replace":
+        _deleteLegacyChunks(store, file)
+    _notifyIngest(file)
 
-def processSample(data: str, file: str, unrestricted: bool) -> None:
-    """Process a sample of data and store embeddings"""
+def ingestChunks(chunks: Iterable[str], file: str, unrestricted: bool, mode: str = "replace", window: int = ingest_window_size,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    """Embed and upsert chunks in fixed-size windows.
+
+    Only one window of embeddings is held at a time, and only one window of
+    chunks too when chunks is a lazy iterator. progress, if given, is called
+    with the number of chunks stored so far after each window. Returns the
+    number of chunks stored.
+    """
+    if mode not in ("replace", "append"):
+        raise ValueError(f"Unknown ingestion mode: {mode}")
+
+    file = _fileKey(file)
+    existing = sourceMapping.file_seqs(file)
+    next_seq = existing[-1] + 1 if mode == "append" and existing else 1
+    first_seq = next_seq
+
+    store = getVectorStore()
+    store.ensure()
+
+    chunks_iter = iter(chunks)
+    start = time.perf_counter()
+    while True:
+        window_chunks = list(islice(chunks_iter, window))
+        if not window_chunks:
+            break
+        embeddings = embedBatch(window_chunks)
+        _upsertChunks(store, embeddings, window_chunks, file, next_seq, unrestricted)
+        next_seq += len(window_chunks)
+        if progress is not None:
+            progress(next_seq - first_seq)
+
+    stored = next_seq - first_seq
+    legacy = False
+    if mode == "replace":
+        _deleteChunks(store, file, [seq for seq in existing if seq >= next_seq])
+        legacy = _deleteLegacyChunks(store, file)
+    if stored or existing or legacy:
+        _notifyIngest(file)
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Ingested {stored} chunks of {file} in {elapsed:.2f}s")
+    return stored
+
+def ingestStream(stream: TextIO, file: str, unrestricted: bool, mode: str = "replace", window: int = ingest_window_size,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    """Chunk a text stream lazily and ingest it through ingestChunks, so memory
+    does not grow with the size of the file"""
+    return ingestChunks(streamChunks(stream), file, unrestricted, mode, window, progress)
+
+def ingestFile(path: Union[str, Path], unrestricted: bool, mode: str = "replace", window: int = ingest_window_size,
+               progress: Optional[Callable[[int], None]] = None) -> int:
+    """Stream a text file from disk through ingestStream"""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return ingestStream(f, path.name, unrestricted, mode, window, progress)
+
+def processSample(data: Union[str, TextIO], file: str, unrestricted: bool, mode: str = "replace") -> None:
+    """Process a sample of data (text or an open text stream) and store embeddings.
+    Re-processing a file replaces its previous chunks."""
     if not data:
         logging.warning("No data to process")
         return
-        
-    chunks = getChunks(data)
-    if not chunks:
-        logging.warning("No chunks generated from data")
-        return
-        
+
+    stream = data if hasattr(data, "read") else io.StringIO(data)
     try:
-        embeddings = [embedText(chunk) for chunk in chunks]
-        storeEmbeddings(embeddings, chunks, file, unrestricted)
+        if not ingestStream(stream, file, unrestricted, mode):
+            logging.warning("No chunks generated from data")
     except Exception as e:
         logging.error(f"Error processing sample: {str(e)}")
         raise
 
+def _lexicalSearch(prompt: str, unrestricted: bool) -> tuple:
+    """Keyword hits for a prompt and whether they are confident enough to answer without the vector search"""
+    if not lexical_search:
+        return [], False
+    if not _namespaces_checked:
+        # The keyword filter trusts the chunk store's restricted flags, which are only settled once legacy vectors are migrated
+        try:
+            migrateNamespaces()
+        except Exception as e:
+            logging.warning(f"Skipping keyword search until vector namespaces are checked: {str(e)}")
+            return [], False
+    hits, covers_query = lexicalIndex.search(prompt, top_k=retrieval_top_k, unrestricted=unrestricted)
+    confident = covers_query and (len(hits) == 1 or hits[0][1] >= lexical_confidence * hits[1][1])
+    return [doc_id for doc_id, _ in hits], confident
+
+def _queryBatch(queries: List[tuple]) -> List[List[str]]:
+    """Answer several (prompt, unrestricted) queries with one embedding request and batched vector lookups.
+    Queries with a confident keyword hit skip the embedding and vector search entirely."""
+    with timed("lexical_search"):
+        lexical = [_lexicalSearch(prompt, unrestricted) for prompt, unrestricted in queries]
+    rankings: List[List[str]] = [ids if confident else [] for ids, confident in lexical]
+    pending = [i for i, (_, confident) in enumerate(lexical) if not confident]
+    with _retrieval_stats_lock:
+        retrievalStats["queries"] += len(queries)
+        retrievalStats["lexical_only"] += len(queries) - len(pending)
+
+    if pending:
+        with timed("embed"):
+            embeddings = embedBatch([queries[i][0] for i in pending])
+
+        # Queries are grouped by access level so each group searches only the namespaces it may see, in one call
+        store = getVectorStore()
+        for unrestricted in (True, False):
+            group = [(i, embedding) for i, embedding in zip(pending, embeddings) if queries[i][1] == unrestricted]
+            if not group:
+                continue
+            with timed("vector_query"):
+                results = store.query_namespaces(
+                    [embedding for _, embedding in group],
+                    _visibleNamespaces(unrestricted),
+                    top_k=retrieval_top_k
+                )
+            for (i, _), result in zip(group, results):
+                vector_ids = [match["id"] for match in result]
+                rankings[i] = reciprocalRankFusion([vector_ids, lexical[i][0]], top_k=retrieval_top_k)
+
+    # Extract matches for the whole batch with one lookup
+    chunk_ids = list(dict.fromkeys(chunk_id for ranking in rankings for chunk_id in ranking))
+    with timed("chunk_lookup"):
+        texts = dict(zip(chunk_ids, sourceMapping.get_many(chunk_ids)))
+    return [[texts[chunk_id] for chunk_id in ranking if texts.get(chunk_id) is not None] for ranking in rankings]
+
+# Concurrent queryDatabase calls arriving within the window share one embedding request and vector lookup
+queryBatcher = MicroBatcher(_queryBatch, max_batch=query_batch_max, max_wait_ms=query_batch_window_ms, name="groot-query")
+
 def queryDatabase(prompt: str, unrestricted: bool) -> List[str]:
     """Query the database for relevant chunks"""
     if not prompt:
@@ -260,66 +622,72 @@ def queryDatabase(prompt: str, unrestricted: bool) -> List[str]:
         return []
         
     try:
-        embeddings = embedText(prompt)
-        
-        # Get index
-        try:
-            index = pc.Index(pinecone_index_name)
-        except Exception as e:
-            logging.error(f"Error accessing Pinecone index: {str(e)}")
-            return []
-        
-        # Query Pinecone
-        if unrestricted:
-            result = index.query(
-                vector=embeddings, 
-                filter={"restricted": False},
-                top_k=5
-            )
-        else:
-            result = index.query(
-                vector=embeddings,
-                top_k=5
-            )
-        
-        # Extract matches
-        matches = []
-        # print("**********sourceMapping = ", sourceMapping)
-        for chunk in result.get("matches", []):
-            chunk_id = chunk.get("id")
-            if chunk_id in sourceMapping:
-                matches.append(sourceMapping[chunk_id])
-        
-        return matches
+        if query_batch_max <= 1:
+            return _queryBatch([(prompt, unrestricted)])[0]
+        return queryBatcher((prompt, unrestricted))
     except Exception as e:
         logging.error(f"Error querying database: {str(e)}")
         return []
 
-def generateResponse(referenceGranted: bool, similarChunks: List[str], prompt: str) -> str:
-    """Generate a response using DeepSeek API"""
-    if not prompt:
-        return "I'm sorry, but I didn't receive a question to answer."
-        
-    try:
+# Returned when generateResponse is called without a prompt
+EMPTY_PROMPT_MESSAGE = "I'm sorry, but I didn't receive a question to answer."
 
-        # Prepare the message with reference information if available
-        if referenceGranted and similarChunks: 
-            formatedReference = "".join(similarChunks)
-            chat.append({
-                "role": "user", 
-                "content": f"""
+def _buildUserContent(referenceGranted: bool, similarChunks: List[str], prompt: str, usage: Optional[Dict[str, int]] = None) -> str:
+    """Prepare the message with reference information if available.
+    The chunks are deduplicated, diversified and packed into the context token budget;
+    usage, when given, receives the number of chunks used and an estimate of the prompt tokens."""
+    content = prompt
+    context = []
+    if referenceGranted and similarChunks: 
+        context = assembleContext(similarChunks, prompt, token_budget=context_token_budget,
+                                  mmr_lambda=context_mmr_lambda, duplicate_threshold=context_duplicate_threshold)
+        formatedReference = "\n\n".join(context)
+        content = f"""
                 Reference Information: {formatedReference}
                 
                 Prompt: {prompt}
                 """
-            })
-        else:
-            chat.append({"role": "user", "content": prompt})
+    if usage is not None:
+        usage["context_chunks"] = len(context)
+        usage["prompt_tokens"] = estimateTokens(SYSTEM_PROMPT) + estimateTokens(content)
+    return content
+
+def _recordPromptTokens(response: Any, usage: Optional[Dict[str, int]]) -> None:
+    """Replace the prompt token estimate with Gemini's own count when the response carries one"""
+    metadata = getattr(response, "usage_metadata", None)
+    count = getattr(metadata, "prompt_token_count", None)
+    if usage is not None and isinstance(count, int):
+        usage["prompt_tokens"] = count
+
+def _generationRequest(content: str) -> Dict[str, Any]:
+    """Keyword arguments for generate_content / generate_content_stream"""
+    from google.genai import types
+
+    return {
+        "model": gemini_model,
+        "contents": types.Content(
+            role='user',
+            parts=[types.Part.from_text(text=content)]
+        ),
+        "config": types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT,
+            temperature=0.3
+        )
+    }
+
+def generateResponse(referenceGranted: bool, similarChunks: List[str], prompt: str, session_id: str = DEFAULT_SESSION,
+                     usage: Optional[Dict[str, int]] = None) -> str:
+    """Generate a response using DeepSeek API.
+    Pass a dict as usage to receive the prompt token count and number of context chunks."""
+    if not prompt:
+        return EMPTY_PROMPT_MESSAGE
         
-        # Maintain chat history (keep last 4 exchanges)
-        if len(chat) >= 9:
-            chat.remove(chat[1])
-            chat.remove(chat[1])
+    try:
+
+        content = _buildUserContent(referenceGranted, similarChunks, prompt, usage)
+        
+        # The session's ring buffer keeps only the last few exchanges
+        chatSessions.append(session_id, "user", content)
 
         
         # Generate response using DeepSeek API
@@ -344,38 +712,71 @@ def generateResponse(referenceGranted: bool, similarChunks: List[str], prompt: s
         # )
         # print(chat[1]['content'])
 
-        client = genai.Client(api_key = gemini_api_key)
-
-        response = client.models.generate_content(
-            model=gemini_model,
-            contents = types.Content(
-                role='user',
-                parts=[types.Part.from_text(text=chat[-1]['content'])]
-            ),
-            config=types.GenerateContentConfig(
-                system_instruction=chat[0]['content'],
-                temperature=0.3
-            )
-        )
+        with timed("generate"):
+            response = geminiProvider.call(lambda client: client.models.generate_content(**_generationRequest(content)))
 
         if not response:
             logging.error(f"DeepSeek API error: {response.text}")
             raise Exception(f"DeepSeek API error: {response.text}")
         
+        _recordPromptTokens(response, usage)
         result = response.text
         # response_text = result["choices"][0]["message"]["content"]
         
-        chat.append({"role": "assistant", "content": result})
+        chatSessions.append(session_id, "assistant", result)
         return result
         
     except Exception as e:
         logging.error(f"Error generating response: {str(e)}")
-        return "I apologize, but I encountered an error while generating the response. Please try again."
-
-def reset_chat_history() -> None:
-    """Reset the chat history to its initial state"""
-    global chat
-    chat = [
-        {"role": "system", "content": "You are Groot, a RAG enhanced Large Language Model. You are like a virtual professor that can regularly learn new things. You are now not restricted to your training dataset. The RAG system will provide you with the reference information you need to answer question which are beyond your knowledge. If you get a Reference Information Along with the prompt, you need to use the given information along with your existing knowledge base (more emphasis on the provided reference). Your purpose is to provide the most accurate and relevant information to the student and help them in their learning journey."},
-    ]
-    logging.info("Chat history reset")
+        return RESPONSE_ERROR_MESSAGE
+
+def generateResponseStream(referenceGranted: bool, similarChunks: List[str], prompt: str, session_id: str = DEFAULT_SESSION,
+                           usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    """Yield the response text piece by piece as Gemini produces it.
+    The assembled answer is added to the session history once the stream ends."""
+    if not prompt:
+        yield EMPTY_PROMPT_MESSAGE
+        return
+
+    content = _buildUserContent(referenceGranted, similarChunks, prompt, usage)
+    chatSessions.append(session_id, "user", content)
+
+    pieces = []
+    start = time.perf_counter()
+    try:
+        with timed("generate_stream"):
+            for chunk in geminiProvider.stream(lambda client: client.models.generate_content_stream(**_generationRequest(content))):
+                _recordPromptTokens(chunk, usage)
+                if chunk.text:
+                    if not pieces:
+                        stageLatency.observe(time.perf_counter() - start, "generate_first_token")
+                    pieces.append(chunk.text)
+                    yield chunk.text
+    except Exception as e:
+        logging.error(f"Error streaming response: {str(e)}")
+        if not pieces:
+            yield RESPONSE_ERROR_MESSAGE
+            return
+
+    chatSessions.append(session_id, "assistant", "".join(pieces))
+
+async def embedTextAsync(text: str) -> List[float]:
+    """embedText for async callers; runs on the bounded I/O executor instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, contextvars.copy_context().run, embedText, text)
+
+async def queryDatabaseAsync(prompt: str, unrestricted: bool) -> List[str]:
+    """queryDatabase for async callers; runs on the bounded I/O executor instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, contextvars.copy_context().run, queryDatabase, prompt, unrestricted)
+
+async def generateResponseAsync(referenceGranted: bool, similarChunks: List[str], prompt: str, session_id: str = DEFAULT_SESSION,
+                                usage: Optional[Dict[str, int]] = None) -> str:
+    """generateResponse for async callers; runs on the bounded I/O executor instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, contextvars.copy_context().run, generateResponse, referenceGranted, similarChunks, prompt, session_id, usage)
+
+def reset_chat_history(session_id: Optional[str] = None) -> None:
+    """Reset the chat history of one session, or of every session when session_id is None"""
+    chatSessions.reset(session_id)
+    logging.info(f"Chat history reset{f' for session {session_id}' if session_id else ''}")
@@ -1,11 +1,23 @@
 from .Groot import (
     generateResponse,    queryDatabase,
     processSample,    reset_chat_history,
-    get_required_env)
+    get_required_env,    embedBatch,
+    ingestFile,    ingestStream,
+    queryDatabaseAsync,    generateResponseAsync,
+    embedTextAsync,    onIngest,
+    generateResponseStream,    warmup,
+    providerStats,    migrateNamespaces,
+    ingestChunks)
 __all__ = [
     'generateResponse',    'queryDatabase',
     'processSample',    'reset_chat_history',
-    'get_required_env'
+    'get_required_env',    'embedBatch',
+    'ingestFile',    'ingestStream',
+    'queryDatabaseAsync',    'generateResponseAsync',
+    'embedTextAsync',    'onIngest',
+    'generateResponseStream',    'warmup',
+    'providerStats',    'migrateNamespaces',
+    'ingestChunks'
 ]
 
 
@@ -1,21 +1,37 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Literal
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 import json
 import logging
+import shutil
+import uuid
 from pathlib import Path
 import uvicorn
 
 # Import Groot functions
 from Groot import (
-    generateResponse, 
-    queryDatabase, 
-    processSample, 
+    generateResponseAsync, 
+    generateResponseStream,
+    queryDatabaseAsync, 
+    ingestFile,
+    embedTextAsync,
+    onIngest,
+    RESPONSE_ERROR_MESSAGE,
     reset_chat_history,
+    providerStats,
+    warmup,
     get_required_env
 )
+from semantic_cache import SemanticCache
+import metrics
+from jobs import JobManager, QueueFullError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,17 +44,68 @@ try:
     API_KEY = get_required_env("API_KEY", "default_api_key_for_development")
     PORT = int(get_required_env("UVICORN_PORT", "3000"))
     DEBUG = get_required_env("FLASK_DEBUG", "True").lower() == "true"
+    FAQ_CACHE_THRESHOLD = float(get_required_env("FAQ_CACHE_THRESHOLD", "0.92"))
+    FAQ_CACHE_SIZE = int(get_required_env("FAQ_CACHE_SIZE", "1000"))
+    FAQ_CACHE_TTL = int(get_required_env("FAQ_CACHE_TTL", "3600"))
+    INGEST_JOB_WORKERS = int(get_required_env("INGEST_JOB_WORKERS", "2"))
+    INGEST_QUEUE_SIZE = int(get_required_env("INGEST_QUEUE_SIZE", "100"))  # Files waiting for a worker before /jobs answers 429
+    UPLOAD_DIR = Path(get_required_env("UPLOAD_DIR", "Dataset/Uploads"))
 except ValueError as e:
     logging.error(f"Configuration error: {str(e)}")
     raise
 
+async def run_warmup(app: FastAPI):
+    """Warm up Groot's clients and stores off the event loop; failures are reported by /health, not raised"""
+    try:
+        app.state.warmup = await run_in_threadpool(warmup)
+    except Exception as e:
+        logging.error(f"Warmup failed: {str(e)}")
+        app.state.warmup = {"error": str(e)}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving immediately; the first requests may still pay for client setup
+    app.state.warmup = "pending"
+    task = asyncio.create_task(run_warmup(app))
+    yield
+    if not task.done():
+        task.cancel()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Groot API", 
     description="RAG-Powered Chatbot API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace ID (reusing the caller's X-Trace-Id) and record its latency"""
+    trace_id = request.headers.get("x-trace-id") or metrics.newTraceID()
+    token = metrics.traceID.set(trace_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        # Label by route template rather than raw path to keep the number of series bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        # Streaming responses are timed up to their first byte
+        metrics.requestLatency.observe(time.perf_counter() - start, request.method, path, str(status))
+        metrics.traceID.reset(token)
+
+# Answers to FAQ questions, matched by question similarity and dropped whenever new content is ingested
+faq_cache = SemanticCache(threshold=FAQ_CACHE_THRESHOLD, max_entries=FAQ_CACHE_SIZE, ttl=FAQ_CACHE_TTL)
+onIngest(faq_cache.clear)
+
+# Background ingestion for /jobs
+ingest_jobs = JobManager(ingestFile, workers=INGEST_JOB_WORKERS, max_pending=INGEST_QUEUE_SIZE)
+
 # API key validation
 async def validate_api_key(x_api_key: str = Header(..., description="API Key for authentication")):
     if x_api_key != API_KEY:
@@ -49,10 +116,12 @@ async def validate_api_key(x_api_key: str = Header(..., description="API Key for
 class ChatRequest(BaseModel):
     message: str = Field(..., description="User message to process")
     unrestricted: bool = Field(False, description="Whether to allow restricted sources")
+    session_id: str = Field("default", description="Conversation the message belongs to")
 
 class ChatResponse(BaseModel):
     response: str = Field(..., description="Groot's response to the user message")
     reference_used: bool = Field(..., description="Whether reference information was used")
+    prompt_tokens: Optional[int] = Field(None, description="Tokens in the prompt sent to the model")
 
 class ProfileRecommendationRequest(BaseModel):
     user_interests: List[str] = Field(..., description="List of user interests")
@@ -69,10 +138,21 @@ class FAQResponse(BaseModel):
     answer: str = Field(..., description="Answer to the FAQ question")
     context_used: bool = Field(..., description="Whether user context was used")
     has_reference: bool = Field(..., description="Whether reference information was used")
+    cached: bool = Field(False, description="Whether the answer came from the FAQ answer cache")
+    cache_hit_rate: float = Field(0.0, description="FAQ answer cache hit rate so far")
+
+class ResetRequest(BaseModel):
+    session_id: str = Field("default", description="Conversation to reset")
 
 class FileUploadRequest(BaseModel):
     file_path: str = Field(..., description="Path to the file to process")
     unrestricted: bool = Field(False, description="Whether to mark the content as unrestricted")
+    mode: Literal["replace", "append"] = Field("replace", description="'replace' the file's previous chunks or 'append' to them")
+
+class JobRequest(BaseModel):
+    file_paths: List[str] = Field(..., description="Server-side paths of the files to ingest")
+    unrestricted: bool = Field(False, description="Whether to mark the content as unrestricted")
+    mode: Literal["replace", "append"] = Field("replace", description="'replace' each file's previous chunks or 'append' to them")
 
 class FileUploadResponse(BaseModel):
     success: bool = Field(..., description="Whether the file was processed successfully")
@@ -86,32 +166,77 @@ async def groot_chat(request: ChatRequest):
     Process a chat message and return Groot's response.
     """
     try:
-        # Get relevant chunks from Pinecone
-        similar_chunks = queryDatabase(request.message, request.unrestricted)
+        # Get relevant chunks from the vector store
+        similar_chunks = await queryDatabaseAsync(request.message, request.unrestricted)
 
         # print("similar_chunks = ", similar_chunks)
         
         # Generate response using Groot's logic
-        response = generateResponse(
+        usage = {}
+        response = await generateResponseAsync(
             referenceGranted=bool(similar_chunks),
             similarChunks=similar_chunks,
-            prompt=request.message
+            prompt=request.message,
+            session_id=request.session_id,
+            usage=usage
         )
         
         return {
             "response": response,
-            "reference_used": bool(similar_chunks)
+            "reference_used": bool(similar_chunks),
+            "prompt_tokens": usage.get("prompt_tokens")
         }
     except Exception as e:
         logging.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/chat/stream", dependencies=[Depends(validate_api_key)])
+async def groot_chat_stream(request: ChatRequest):
+    """
+    Process a chat message and stream Groot's response as server-sent events.
+    Each 'token' event carries the next piece of text; a final 'done' event
+    reports whether reference information was used and the prompt token count.
+    """
+    try:
+        similar_chunks = await queryDatabaseAsync(request.message, request.unrestricted)
+    except Exception as e:
+        logging.error(f"Error in chat stream endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+
+    def events():
+        # Runs in Starlette's threadpool, so the blocking Gemini stream never touches the event loop
+        usage = {}
+        for piece in generateResponseStream(
+            referenceGranted=bool(similar_chunks),
+            similarChunks=similar_chunks,
+            prompt=request.message,
+            session_id=request.session_id,
+            usage=usage
+        ):
+            yield f"event: token\ndata: {json.dumps({'text': piece})}\n\n"
+        done = {'reference_used': bool(similar_chunks), 'prompt_tokens': usage.get('prompt_tokens')}
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/cinevibe/profile/faq", response_model=FAQResponse, dependencies=[Depends(validate_api_key)])
 async def profile_faq(request: FAQRequest):
     """
     Process a FAQ question and return a response.
     """
     try:
+        # Answers that depend on user context are not shared through the cache
+        question_embedding = None
+        if not request.context:
+            try:
+                question_embedding = await embedTextAsync(request.question)
+            except Exception as e:
+                logging.warning(f"FAQ cache lookup skipped: {str(e)}")
+            if question_embedding is not None:
+                cached = faq_cache.lookup(question_embedding)
+                if cached is not None:
+                    return {**cached, "cached": True, "cache_hit_rate": faq_cache.stats()["hit_rate"]}
+
         # Construct a context-aware prompt for FAQ
         context_str = ""
         if request.context:
@@ -130,21 +255,27 @@ async def profile_faq(request: FAQRequest):
         use the reference information provided to give the most accurate answer.
         """
         
-        # Get relevant chunks from Pinecone
-        similar_chunks = queryDatabase(prompt, True)  # Using unrestricted mode for FAQ
+        # Get relevant chunks from the vector store. Retrieval embeds the bare question, which the
+        # cache lookup above has just embedded, so a cache miss costs a single embedding request
+        similar_chunks = await queryDatabaseAsync(request.question, True)  # Using unrestricted mode for FAQ
         
         # Generate response
-        response = generateResponse(
+        response = await generateResponseAsync(
             referenceGranted=bool(similar_chunks),
             similarChunks=similar_chunks,
-            prompt=prompt
+            prompt=prompt,
+            session_id=f"faq:{request.user_id or 'anonymous'}"
         )
         
-        return {
+        result = {
             "answer": response,
             "context_used": bool(context_str),
             "has_reference": bool(similar_chunks)
         }
+        if question_embedding is not None and response != RESPONSE_ERROR_MESSAGE:
+            faq_cache.put(question_embedding, result)
+
+        return {**result, "cached": False, "cache_hit_rate": faq_cache.stats()["hit_rate"]}
     except Exception as e:
         logging.error(f"Error in FAQ endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing FAQ: {str(e)}")
@@ -158,39 +289,117 @@ async def upload_file(request: FileUploadRequest):
         file_path = Path(request.file_path)
         if not file_path.exists():
             raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
-        
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = f.read()
-        
-        processSample(data, file_path.name, request.unrestricted)
+
+        # Stream the file through chunking, embedding and upsert in fixed windows
+        await run_in_threadpool(ingestFile, file_path, request.unrestricted, request.mode)
         
         return {
             "success": True,
             "message": f"File processed successfully: {file_path.name}",
             "file_name": file_path.name
         }
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logging.error(f"Error in file upload endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+def _save_upload(upload) -> Path:
+    """Copy an uploaded file into its own directory under UPLOAD_DIR, keeping its name as the source ID"""
+    target = UPLOAD_DIR / uuid.uuid4().hex / Path(upload.filename or "upload.txt").name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "wb") as f:
+        shutil.copyfileobj(upload.file, f)
+    return target
+
+@app.post("/jobs", status_code=202, dependencies=[Depends(validate_api_key)])
+async def create_ingest_job(request: Request):
+    """
+    Queue files for background ingestion and return a job ID at once.
+    Send either multipart/form-data with one or more 'files' (plus optional
+    'unrestricted' and 'mode' fields) or a JSON JobRequest with server-side paths.
+    """
+    uploaded = False
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        uploads = [item for item in form.getlist("files") if hasattr(item, "filename")]
+        unrestricted = str(form.get("unrestricted", "false")).lower() == "true"
+        mode = str(form.get("mode", "replace"))
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No files uploaded")
+        uploaded = True
+    else:
+        try:
+            body = JobRequest(**await request.json())
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid job request: {str(e)}")
+        unrestricted, mode = body.unrestricted, body.mode
+        if not body.file_paths:
+            raise HTTPException(status_code=400, detail="No files given")
+        missing = [path for path in body.file_paths if not Path(path).is_file()]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {', '.join(missing)}")
+
+    if mode not in ("replace", "append"):
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}")
+    count = len(uploads) if uploaded else len(body.file_paths)
+    if count > INGEST_QUEUE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {INGEST_QUEUE_SIZE} files per job")
+    if ingest_jobs.stats()["pending_files"] + count > INGEST_QUEUE_SIZE:
+        # Check before copying uploads to disk; submit() re-checks atomically
+        return JSONResponse(status_code=429, content={"detail": "Ingestion queue is full"}, headers={"Retry-After": "5"})
+
+    paths = [await run_in_threadpool(_save_upload, upload) for upload in uploads] if uploaded else body.file_paths
+    try:
+        job = ingest_jobs.submit(paths, unrestricted, mode, cleanup=uploaded)
+    except QueueFullError as e:
+        if uploaded:
+            for path in paths:
+                shutil.rmtree(path.parent, ignore_errors=True)
+        return JSONResponse(status_code=429, content={"detail": str(e)}, headers={"Retry-After": "5"})
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}", dependencies=[Depends(validate_api_key)])
+async def get_ingest_job(job_id: str):
+    """
+    Progress of an ingestion job: overall status and per-file chunks, throughput and errors.
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
 @app.post("/reset", dependencies=[Depends(validate_api_key)])
-async def reset_chat():
+async def reset_chat(request: Optional[ResetRequest] = None):
     """
-    Reset the chat history.
+    Reset the chat history of one session.
     """
     try:
-        reset_chat_history()
+        reset_chat_history(request.session_id if request else "default")
         return {"success": True, "message": "Chat history reset successfully"}
     except Exception as e:
         logging.error(f"Error resetting chat history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error resetting chat history: {str(e)}")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Per-stage and per-endpoint latency histograms in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint.
     """
-    return {"status": "healthy", "version": "1.0.0"}
+    return {
+        "status": "healthy",
+        "version": "1.0.0",
+        "warmup": getattr(app.state, "warmup", "pending"),
+        "providers": providerStats()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,93 @@
+"""Concurrency benchmark for the Groot API.
+
+Replaces the Gemini/vector store calls behind queryDatabase and
+generateResponse with sleeps of a configurable latency, fires many /chat
+requests at the ASGI app at once and measures total wall time plus the
+latency of /health while those chats are in flight. Prints one JSON line
+per concurrency level:
+
+    python benchmarks/bench_concurrency.py --concurrency 1 16 64 --latency-ms 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+GROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(GROOT_DIR))
+
+for key in ("DEEPSEEK_API_KEY", "GEMINI_API_KEY", "PINECONE_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+os.environ.setdefault("API_KEY", "benchmark")
+
+
+async def run(concurrency: int, latency: float, app) -> dict:
+    import httpx
+
+    headers = {"x-api-key": os.environ["API_KEY"]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def chat(i: int) -> float:
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"message": f"question {i}", "unrestricted": True}, headers=headers)
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        async def health() -> float:
+            await asyncio.sleep(latency / 4)  # Probe once the chats are in flight
+            start = time.perf_counter()
+            (await client.get("/health")).raise_for_status()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        health_task = asyncio.create_task(health())
+        latencies = await asyncio.gather(*(chat(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        health_latency = await health_task
+
+    return {
+        "benchmark": "chat_concurrency",
+        "concurrency": concurrency,
+        "upstream_latency_ms": latency * 1000,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(concurrency / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "health_ms_during_load": round(health_latency * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency-ms", type=float, default=200, help="Simulated latency of each upstream call")
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    os.chdir(tempfile.mkdtemp(prefix="groot-bench-"))
+
+    import Groot
+
+    def fakeQueryDatabase(prompt, unrestricted):
+        time.sleep(latency)
+        return ["reference"]
+
+    def fakeGenerateResponse(referenceGranted, similarChunks, prompt, session_id=None, usage=None):
+        time.sleep(latency)
+        return f"answer to {prompt}"
+
+    Groot.queryDatabase = fakeQueryDatabase
+    Groot.generateResponse = fakeGenerateResponse
+
+    from api import app
+    for concurrency in args.concurrency:
+        print(json.dumps(asyncio.run(run(concurrency, latency, app))))
+
+
+if __name__ == "__main__":
+    main()
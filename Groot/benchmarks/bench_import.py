@@ -0,0 +1,84 @@
+"""Import-time benchmark for the Groot module and the API app.
+
+Imports each module in a fresh interpreter (from an empty working directory,
+without any API keys set) several times and prints one JSON line per module
+with the median wall time, the slowest imports reported by -X importtime,
+and whether the import left files behind. Exits non-zero when a median
+exceeds --budget-ms, so it can guard against startup regressions:
+
+    python benchmarks/bench_import.py --runs 5 --budget-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+GROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def importOnce(module: str, workdir: str, env: dict) -> tuple:
+    """Import module in a fresh interpreter; returns (seconds, -X importtime lines)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {str(GROOT_DIR)!r}); import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return elapsed, [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+
+
+def slowest(lines: list, count: int) -> list:
+    """Direct imports of the benchmarked module with the largest cumulative time"""
+    rows = []
+    for line in lines:
+        _, cumulative_us, name = line.split("|")
+        # Nested imports are indented by two spaces per level after the single separator space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1 and cumulative_us.strip().isdigit():
+            rows.append((int(cumulative_us), name.strip()))
+    return [{"module": name, "ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:count]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["Groot", "api"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when a median import time exceeds this")
+    args = parser.parse_args()
+
+    # Keys are deliberately absent: importing must not need them or contact any service
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GEMINI_API_KEY", "PINECONE_API_KEY", "DEEPSEEK_API_KEY")}
+
+    over_budget = False
+    for module in args.modules:
+        workdir = tempfile.mkdtemp(prefix="groot-bench-")
+        timings, lines = [], []
+        for _ in range(args.runs):
+            elapsed, lines = importOnce(module, workdir, env)
+            timings.append(elapsed)
+        median_ms = statistics.median(timings) * 1000
+        over_budget |= args.budget_ms is not None and median_ms > args.budget_ms
+        print(json.dumps({
+            "benchmark": "import_time",
+            "module": module,
+            "runs": args.runs,
+            "median_ms": round(median_ms, 1),
+            "max_ms": round(max(timings) * 1000, 1),
+            "budget_ms": args.budget_ms,
+            "files_created": sorted(os.listdir(workdir)),
+            "slowest": slowest(lines, 5),
+        }))
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
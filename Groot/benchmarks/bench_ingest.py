@@ -0,0 +1,102 @@
+"""Peak-memory benchmark for streaming ingestion.
+
+Generates text files of increasing size and runs them through
+Groot.ingestFile with the Gemini and Pinecone calls replaced by local
+stand-ins, then prints one JSON line per file with throughput and peak
+memory. Run from anywhere:
+
+    python benchmarks/bench_ingest.py --sizes 1 10 100
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+GROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(GROOT_DIR))
+
+WORDS = ("movie", "ticket", "theater", "screen", "seat", "show", "booking", "review",
+         "popcorn", "drama", "comedy", "thriller", "evening", "premiere", "director")
+
+
+def discardStore():
+    """Vector store stand-in that accepts and drops every write"""
+    from vector_store import VectorStore
+
+    class DiscardStore(VectorStore):
+        def upsert(self, vectors, namespace=""):
+            pass
+
+        def delete(self, ids, namespace=""):
+            pass
+
+        def namespace_sizes(self):
+            return {}
+
+    return DiscardStore()
+
+
+def fakeEmbedBatch(chunks, *args, **kwargs):
+    return [[0.0] * 768 for _ in chunks]
+
+
+def writeCorpus(path: Path, size_mb: int) -> None:
+    rng = random.Random(size_mb)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            paragraph = " ".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            ) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="File sizes in MB")
+    parser.add_argument("--window", type=int, default=None, help="Chunks per embed/upsert window")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="groot-bench-")
+    os.chdir(workdir)  # Keep Dataset/ and groot.log out of the source tree
+
+    import Groot
+    Groot.embedBatch = fakeEmbedBatch
+    Groot._vector_store = discardStore()
+    window = args.window or Groot.ingest_window_size
+
+    for size_mb in args.sizes:
+        path = Path(workdir) / f"corpus_{size_mb}mb.txt"
+        writeCorpus(path, size_mb)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks = Groot.ingestFile(path, True, window=window)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(json.dumps({
+            "benchmark": "ingest",
+            "file_mb": size_mb,
+            "window": window,
+            "chunks": chunks,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(chunks / elapsed, 1) if elapsed else None,
+            "peak_traced_mb": round(peak / (1024 * 1024), 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        }))
+        path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Micro-batching benchmark for queryDatabase.
+
+Fires bursts of concurrent queryDatabase calls against a stand-in Gemini
+client and vector store that each sleep for a configurable latency per
+request, with query micro-batching disabled and enabled. Prints one JSON
+line per run with upstream request counts and latency percentiles:
+
+    python benchmarks/bench_query_batch.py --concurrency 1 16 64 --latency-ms 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+GROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(GROOT_DIR))
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self) -> None:
+        with self._lock:
+            self.value += 1
+
+
+def fakeGemini(latency: float, calls: Counter):
+    """Gemini client stand-in whose embed_content sleeps once per request"""
+    class Embedding:
+        def __init__(self, text):
+            self.values = [float(len(text))] + [1.0] * 767
+
+    class Response:
+        def __init__(self, contents):
+            self.embeddings = [Embedding(text) for text in contents]
+
+    class Models:
+        def embed_content(self, model, contents, config=None):
+            calls.add()
+            time.sleep(latency)
+            return Response([contents] if isinstance(contents, str) else contents)
+
+    class Client:
+        models = Models()
+
+    return Client()
+
+
+def fakeStore(latency: float, calls: Counter):
+    """Vector store stand-in that sleeps once per query_many or query_namespaces call"""
+    from vector_store import VectorStore
+
+    class SleepingStore(VectorStore):
+        def query(self, vector, top_k=5, filter=None, namespace=""):
+            return self.query_many([vector], top_k, filter, namespace)[0]
+
+        def query_many(self, vectors, top_k=5, filter=None, namespace=""):
+            return self.query_namespaces(vectors, [namespace], top_k, filter)
+
+        def query_namespaces(self, vectors, namespaces, top_k=5, filter=None):
+            calls.add()
+            time.sleep(latency)
+            return [[] for _ in vectors]
+
+        def namespace_sizes(self):
+            # Nothing stored, so there are no legacy vectors to migrate and the keyword search runs
+            return {}
+
+    return SleepingStore()
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+
+def run(Groot, concurrency: int, latency: float, batching: bool) -> dict:
+    embed_calls, query_calls = Counter(), Counter()
+    Groot.geminiProvider.override(fakeGemini(latency, embed_calls))
+    Groot._vector_store = fakeStore(latency, query_calls)
+    Groot.query_batch_max = Groot.queryBatcher.max_batch if batching else 1
+
+    def query(i: int) -> float:
+        start = time.perf_counter()
+        Groot.queryDatabase(f"question {concurrency} {batching} {i}", i % 2 == 0)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(query, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "query_batching",
+        "batching": batching,
+        "concurrency": concurrency,
+        "upstream_latency_ms": latency * 1000,
+        "embed_requests": embed_calls.value,
+        "vector_requests": query_calls.value,
+        "seconds": round(elapsed, 3),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated latency of each upstream request")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="groot-bench-"))  # Keep Dataset/ and groot.log out of the source tree
+
+    import Groot
+    for concurrency in args.concurrency:
+        for batching in (False, True):
+            print(json.dumps(run(Groot, concurrency, args.latency_ms / 1000, batching)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Local stand-ins for Gemini and the vector index, used by the benchmarks.
+
+The fakes answer with the same shapes as the real clients, sleep for a
+configurable latency (plus optional jitter) per request and count the
+requests they receive, so benchmarks exercise Groot's real code paths
+without network access or API keys.
+"""
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from vector_store import LocalVectorStore, VectorStore
+
+WORDS = ("movie", "ticket", "theater", "screen", "seat", "show", "booking", "review",
+         "popcorn", "drama", "comedy", "thriller", "evening", "premiere", "director",
+         "refund", "parking", "snack", "matinee", "imax", "balcony", "recliner", "offer")
+
+
+class Latency:
+    """Sleeps for `ms` milliseconds plus up to `jitter_ms` of uniform jitter"""
+
+    def __init__(self, ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.ms = ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self) -> None:
+        with self._lock:
+            delay = self.ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+class RequestCounter:
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, kind: str) -> None:
+        with self._lock:
+            self._counts[kind] = self._counts.get(kind, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+def fakeEmbedding(text: str, dimension: int = 768) -> List[float]:
+    """Deterministic unit vector for a text; equal texts get equal vectors"""
+    seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class _Embedding:
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+class _EmbedResponse:
+    def __init__(self, embeddings: List[_Embedding]):
+        self.embeddings = embeddings
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count: int):
+        self.prompt_token_count = prompt_token_count
+
+
+class _GenerateResponse:
+    def __init__(self, text: str, prompt_tokens: Optional[int] = None):
+        self.text = text
+        self.usage_metadata = _UsageMetadata(prompt_tokens) if prompt_tokens is not None else None
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGemini"):
+        self.owner = owner
+
+    def embed_content(self, model: str, contents: Any, config: Any = None) -> _EmbedResponse:
+        self.owner.requests.add("embed")
+        self.owner.embed_latency.sleep()
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        return _EmbedResponse([_Embedding(fakeEmbedding(text, self.owner.dimension)) for text in texts])
+
+    def _answer(self, contents: Any) -> str:
+        prompt = getattr(getattr(contents, "parts", [None])[0], "text", None) or str(contents)
+        return f"Here is what I found about {prompt.strip()[-60:]}. " * 3
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> _GenerateResponse:
+        self.owner.requests.add("generate")
+        self.owner.generate_latency.sleep()
+        return _GenerateResponse(self._answer(contents), prompt_tokens=len(str(contents)) // 4)
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[_GenerateResponse]:
+        self.owner.requests.add("generate_stream")
+        self.owner.generate_latency.sleep()  # Time to first token
+        for word in self._answer(contents).split(" "):
+            if self.owner.token_latency.ms or self.owner.token_latency.jitter_ms:
+                self.owner.token_latency.sleep()
+            yield _GenerateResponse(word + " ")
+
+
+class FakeGemini:
+    """Stand-in for google.genai.Client with embed_content, generate_content and generate_content_stream"""
+
+    def __init__(self, embed_latency: Latency = None, generate_latency: Latency = None,
+                 token_latency: Latency = None, dimension: int = 768):
+        self.embed_latency = embed_latency or Latency()
+        self.generate_latency = generate_latency or Latency()
+        self.token_latency = token_latency or Latency()
+        self.dimension = dimension
+        self.requests = RequestCounter()
+        self.models = _FakeModels(self)
+
+
+class FakeVectorStore(VectorStore):
+    """LocalVectorStore behind a simulated network round trip per request"""
+
+    def __init__(self, path: str, dimension: int = 768, latency: Latency = None):
+        self.inner = LocalVectorStore(path, dimension)
+        self.latency = latency or Latency()
+        self.requests = RequestCounter()
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        self.requests.add("upsert")
+        self.latency.sleep()
+        self.inner.upsert(vectors, namespace=namespace)
+
+    def delete(self, ids: Sequence[str], namespace: str = "") -> None:
+        self.requests.add("delete")
+        self.latency.sleep()
+        self.inner.delete(ids, namespace=namespace)
+
+    def fetch(self, ids: Sequence[str], namespace: str = "") -> List[Dict[str, Any]]:
+        self.requests.add("fetch")
+        self.latency.sleep()
+        return self.inner.fetch(ids, namespace=namespace)
+
+    def namespace_sizes(self) -> Dict[str, int]:
+        self.requests.add("stats")
+        self.latency.sleep()
+        return self.inner.namespace_sizes()
+
+    def query(self, vector: Sequence[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+              namespace: str = "") -> List[Dict[str, Any]]:
+        return self.query_many([vector], top_k=top_k, filter=filter, namespace=namespace)[0]
+
+    def query_many(self, vectors: Sequence[Sequence[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+                   namespace: str = "") -> List[List[Dict[str, Any]]]:
+        return self.query_namespaces(vectors, [namespace], top_k=top_k, filter=filter)
+
+    def query_namespaces(self, vectors: Sequence[Sequence[float]], namespaces: Sequence[str], top_k: int = 5,
+                         filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        # One request per namespace, sent concurrently like the Pinecone store does
+        for _ in namespaces:
+            self.requests.add("query")
+        self.latency.sleep()
+        return self.inner.query_namespaces(vectors, namespaces, top_k=top_k, filter=filter)
+
+
+def install(Groot, gemini: FakeGemini, store: VectorStore) -> None:
+    """Point an imported Groot module at the fakes"""
+    Groot.geminiProvider.override(gemini)
+    with Groot._vector_store_lock:
+        Groot._vector_store = store
+
+
+def corpus(paragraphs: int, seed: int = 0) -> str:
+    """Pseudo-random cinema-themed text with blank lines between paragraphs"""
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+            for _ in range(rng.randint(2, 6))
+        )
+        for _ in range(paragraphs)
+    )
@@ -0,0 +1,289 @@
+"""Offline benchmark suite for Groot and the QR generator.
+
+Replaces Gemini and the vector index with the local stand-ins from fakes.py
+(configurable latency, no keys or network needed) and drives processSample,
+queryDatabase, the /chat, /upload and /cinevibe/profile/faq endpoints and
+the QR endpoints at each concurrency level. Results (throughput, p50/p95/p99
+latency, upstream request counts and memory) are written as JSON and can be
+compared against an earlier run:
+
+    python benchmarks/run.py --concurrency 1 8 32 --output results.json
+    python benchmarks/run.py --output new.json --compare results.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+GROOT_DIR = BENCH_DIR.parent
+QR_DIR = GROOT_DIR.parent / "qr_generator"
+sys.path.insert(0, str(GROOT_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+# The fakes never need real keys; the API still checks its own
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("QR_API_KEY", "benchmark")
+
+SCENARIOS = ("process_sample", "query_database", "chat", "upload", "faq", "qr", "qr_image")
+
+TICKET = {
+    "movie": "The Grand Premiere", "theater": "PVR Cinemas Screen 4", "seats": ["F7", "F8"],
+    "date": "2026-10-18", "time": "21:30", "price": "560", "ticket_id": "TCK-000000"
+}
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2) if ordered else 0.0
+
+
+def summarise(scenario: str, concurrency: int, latencies: List[float], errors: int, seconds: float,
+              upstream: Dict[str, int], traced_peak: Optional[int]) -> Dict[str, Any]:
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(latencies) / seconds, 2) if seconds > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "upstream_requests": upstream,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if traced_peak is not None:
+        result["traced_peak_mb"] = round(traced_peak / (1024 * 1024), 2)
+    return result
+
+
+def runThreads(call: Callable[[int], Any], indices: range, concurrency: int) -> tuple:
+    """Run call(i) for every index on `concurrency` threads; returns (latencies, errors, seconds)"""
+    def timed(i: int) -> Optional[float]:
+        start = time.perf_counter()
+        try:
+            call(i)
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, indices))
+    seconds = time.perf_counter() - start
+    latencies = [outcome for outcome in outcomes if outcome is not None]
+    return latencies, len(outcomes) - len(latencies), seconds
+
+
+def runHTTP(app, send: Callable, indices: range, concurrency: int) -> tuple:
+    """Send one request per index through the ASGI app, at most `concurrency` at a time"""
+    import httpx
+
+    async def main() -> tuple:
+        semaphore = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            async def one(i: int) -> Optional[float]:
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await send(client, i)
+                    if response.status_code >= 400:
+                        return None
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            outcomes = await asyncio.gather(*(one(i) for i in indices))
+            seconds = time.perf_counter() - start
+        latencies = [outcome for outcome in outcomes if outcome is not None]
+        return latencies, len(outcomes) - len(latencies), seconds
+
+    return asyncio.run(main())
+
+
+class Suite:
+    def __init__(self, args: argparse.Namespace, workdir: Path):
+        import fakes
+
+        self.args = args
+        self.workdir = workdir
+        self.gemini = fakes.FakeGemini(
+            embed_latency=fakes.Latency(args.embed_ms, args.jitter_ms, seed=1),
+            generate_latency=fakes.Latency(args.generate_ms, args.jitter_ms, seed=2),
+        )
+        self.store = fakes.FakeVectorStore(str(workdir / "Vectors"), latency=fakes.Latency(args.vector_ms, args.jitter_ms, seed=3))
+        self.corpus = fakes.corpus
+
+        import Groot
+        fakes.install(Groot, self.gemini, self.store)
+        self.Groot = Groot
+        self._api = None
+        self._qr_api = None
+
+    @property
+    def api(self):
+        if self._api is None:
+            from api import app
+            self._api = app
+        return self._api
+
+    @property
+    def qr_api(self):
+        if self._qr_api is None:
+            sys.path.insert(0, str(QR_DIR))
+            from qr_api import app
+            self._qr_api = app
+        return self._qr_api
+
+    def seed(self) -> None:
+        """Ingest a small corpus so the retrieval scenarios have something to find"""
+        for i in range(self.args.seed_documents):
+            self.Groot.processSample(self.corpus(20, seed=i), f"seed_{i}", True)
+
+    def question(self, i: int) -> str:
+        # A bounded pool of distinct questions, so caches see realistic repeats
+        return f"What does the {self.corpus(1, seed=i % self.args.distinct_questions)[:60]} offer"
+
+    def run(self, scenario: str, concurrency: int, tag: int) -> Dict[str, Any]:
+        headers = {"x-api-key": os.environ["API_KEY"]}
+        requests = self.args.requests or max(32, concurrency * 4)
+
+        # Import the apps before timing anything
+        api = self.api if scenario in ("chat", "upload", "faq") else None
+        qr_api = self.qr_api if scenario in ("qr", "qr_image") else None
+
+        if scenario == "process_sample":
+            call = lambda i: self.Groot.processSample(self.corpus(10, seed=(tag + 1) * 100_000 + i), f"bench_{tag}_{i}", True)
+            measure = lambda indices: runThreads(call, indices, concurrency)
+        elif scenario == "query_database":
+            call = lambda i: self.Groot.queryDatabase(self.question(i), i % 2 == 0)
+            measure = lambda indices: runThreads(call, indices, concurrency)
+        elif scenario == "chat":
+            send = lambda client, i: client.post("/chat", headers=headers, json={
+                "message": self.question(i), "unrestricted": True, "session_id": f"bench-{i % 16}"})
+            measure = lambda indices: runHTTP(api, send, indices, concurrency)
+        elif scenario == "upload":
+            paths = []
+            for i in range(requests + self.args.warmup):
+                path = self.workdir / f"upload_{tag}_{i}.txt"
+                path.write_text(self.corpus(30, seed=(tag + 1) * 100_000 + i), encoding="utf-8")
+                paths.append(path)
+            send = lambda client, i: client.post("/upload", headers=headers, json={
+                "file_path": str(paths[i]), "unrestricted": True})
+            measure = lambda indices: runHTTP(api, send, indices, concurrency)
+        elif scenario == "faq":
+            send = lambda client, i: client.post("/cinevibe/profile/faq", headers=headers, json={
+                "question": self.question(i)})
+            measure = lambda indices: runHTTP(api, send, indices, concurrency)
+        elif scenario in ("qr", "qr_image"):
+            endpoint = "/generate-qr" if scenario == "qr" else "/generate-qr-image"
+            send = lambda client, i: client.post(endpoint, headers={"x-api-key": os.environ["QR_API_KEY"]},
+                                                 json={**TICKET, "ticket_id": f"TCK-{i % 64:06d}"})
+            measure = lambda indices: runHTTP(qr_api, send, indices, concurrency)
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+
+        # A few untimed requests first, so one-off setup (lazy clients, index builds) is not measured
+        if self.args.warmup:
+            measure(range(requests, requests + self.args.warmup))
+        self.gemini.requests.reset()
+        self.store.requests.reset()
+
+        if self.args.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        latencies, errors, seconds = measure(range(requests))
+        traced_peak = None
+        if self.args.trace_memory:
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        upstream = {**{f"gemini_{k}": v for k, v in self.gemini.requests.snapshot().items()},
+                    **{f"vector_{k}": v for k, v in self.store.requests.snapshot().items()}}
+        return summarise(scenario, concurrency, latencies, errors, seconds, upstream, traced_peak)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """Print the change against a baseline run; returns True when something regressed beyond tolerance"""
+    with open(baseline_path, "r") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressed = False
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        throughput = (result["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] if before["throughput_rps"] else 0.0
+        p99 = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] if before["p99_ms"] else 0.0
+        worse = throughput < -tolerance or p99 > tolerance
+        regressed |= worse
+        print(json.dumps({
+            "compare": result["scenario"],
+            "concurrency": result["concurrency"],
+            "throughput_change": round(throughput, 3),
+            "p99_change": round(p99, 3),
+            "regressed": worse,
+        }), file=sys.stderr)
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=None, help="Requests per run (default: max(32, 4 x concurrency))")
+    parser.add_argument("--embed-ms", type=float, default=40, help="Simulated latency of each embedding request")
+    parser.add_argument("--generate-ms", type=float, default=300, help="Simulated latency of each generation request")
+    parser.add_argument("--vector-ms", type=float, default=20, help="Simulated latency of each vector index request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform jitter added to every simulated request")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests sent before each run")
+    parser.add_argument("--seed-documents", type=int, default=20)
+    parser.add_argument("--distinct-questions", type=int, default=50)
+    parser.add_argument("--trace-memory", action="store_true", help="Record the traced peak allocation per run (slower)")
+    parser.add_argument("--output", help="Write the results JSON to this file as well as stdout")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative throughput drop / p99 rise")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="groot-bench-"))
+    os.chdir(workdir)  # Keep Dataset/ and groot.log out of the source tree
+
+    import logging
+    logging.disable(logging.WARNING)  # Per-request log lines would dominate the measurements
+
+    suite = Suite(args, workdir)
+    suite.seed()
+    results = []
+    for tag, (scenario, concurrency) in enumerate((s, c) for s in args.scenarios for c in args.concurrency):
+        results.append(suite.run(scenario, concurrency, tag))
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "embed_ms": args.embed_ms, "generate_ms": args.generate_ms,
+            "vector_ms": args.vector_ms, "jitter_ms": args.jitter_ms,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import Groot
+from chunker import chunkFile
+
+chunk_workers = int(Groot.get_required_env("BOOTSTRAP_CHUNK_WORKERS", str(min(4, os.cpu_count() or 1))))
+embed_workers = int(Groot.get_required_env("BOOTSTRAP_EMBED_WORKERS", "4"))
+# Files above this size are streamed by an embed worker instead of being chunked whole in a child process
+stream_threshold = int(Groot.get_required_env("BOOTSTRAP_STREAM_THRESHOLD_MB", "32")) * 1024 * 1024
+
+# Progress of the current or last bootstrap run
+bootstrapStatus: Dict[str, Any] = {
+    "running": False, "total": 0, "done": 0, "failed": 0, "skipped": 0,
+    "chunks": 0, "chunks_per_sec": 0.0, "current": []
+}
+_status_lock = threading.Lock()
+
+
+class BootstrapManifest:
+    """Checkpoint file recording which Dataset files have been ingested.
+
+    Entries are keyed by file name and hold the size and mtime the file had
+    when it was ingested, so a restarted bootstrap can skip finished files
+    and retry everything else.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable bootstrap manifest: {str(e)}")
+
+    @staticmethod
+    def _signature(path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_done(self, path: Path) -> bool:
+        entry = self.entries.get(path.name)
+        return bool(entry) and entry.get("status") == "done" and all(
+            entry.get(key) == value for key, value in self._signature(path).items()
+        )
+
+    def mark(self, path: Path, status: str, **fields: Any) -> None:
+        with self._lock:
+            entry = {"status": status, "updated_at": time.time(), **fields}
+            if path.exists():
+                entry.update(self._signature(path))
+            self.entries[path.name] = entry
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def _moveToEmbedded(path: Path, embedded_dir: Path) -> None:
+    target_path = embedded_dir / path.name
+    if target_path.exists():
+        target_path.unlink()  # Remove existing file if it exists
+    shutil.move(str(path), str(target_path))
+
+
+def _reportProgress(path: Path, chunks: int, failed: bool, started: float) -> None:
+    with _status_lock:
+        bootstrapStatus["failed" if failed else "done"] += 1
+        bootstrapStatus["chunks"] += chunks
+        if path.name in bootstrapStatus["current"]:
+            bootstrapStatus["current"].remove(path.name)
+        elapsed = time.perf_counter() - started
+        bootstrapStatus["chunks_per_sec"] = bootstrapStatus["chunks"] / elapsed if elapsed > 0 else 0.0
+        finished = bootstrapStatus["done"] + bootstrapStatus["failed"] + bootstrapStatus["skipped"]
+        logging.info(
+            f"Bootstrap progress: {finished}/{bootstrapStatus['total']} files, "
+            f"{bootstrapStatus['chunks']} chunks, {bootstrapStatus['chunks_per_sec']:.1f} chunks/sec"
+        )
+
+
+def _ingest(path: Path, chunks: Optional[List[str]], unrestricted: bool, embedded_dir: Path,
+            manifest: BootstrapManifest, started: float) -> None:
+    """Embed and store one file (pre-chunked, or streamed when chunks is None), then checkpoint and move it"""
+    with _status_lock:
+        bootstrapStatus["current"].append(path.name)
+    try:
+        manifest.mark(path, "ingesting")
+        if chunks is None:
+            count = Groot.ingestFile(path, unrestricted)
+        else:
+            # Embedded and upserted a window at a time, like streamed files
+            count = Groot.ingestChunks(chunks, path.name, unrestricted) if chunks else 0
+        manifest.mark(path, "done", chunks=count)
+        _moveToEmbedded(path, embedded_dir)
+        logging.info(f"Processed and moved file: {path.name}")
+        _reportProgress(path, count, False, started)
+    except Exception as e:
+        logging.error(f"Error processing file {path.name}: {str(e)}")
+        manifest.mark(path, "failed", error=str(e))
+        _reportProgress(path, 0, True, started)
+
+
+def _storePaths() -> List[Path]:
+    """Groot's own stores (chunk store, embedding cache, local vector index), which default to living in Dataset/"""
+    return [Path(path).resolve() for path in (Groot.chunk_store_path, Groot.embedding_cache_path, Groot.local_vector_path)]
+
+
+def _isStoreFile(path: Path, stores: List[Path]) -> bool:
+    # Matches the store itself and its side files: SQLite -wal/-shm, and the vector index's
+    # .npy/.json/.log files for every namespace
+    path = path.resolve()
+    return any(path.parent == store.parent and path.name.startswith(store.name) for store in stores)
+
+
+def bootstrapDataset(dataset_dir: Path, embedded_dir: Path, unrestricted: bool = True,
+                     chunk_workers: int = chunk_workers, embed_workers: int = embed_workers) -> Dict[str, Any]:
+    """Ingest every file waiting in dataset_dir and move it to embedded_dir.
+
+    Files are chunked in a process pool and embedded/stored in a thread pool.
+    Progress is checkpointed to embedded_dir/manifest.json, so a restart skips
+    files that were already ingested. Returns the final bootstrapStatus.
+    """
+    dataset_dir, embedded_dir = Path(dataset_dir), Path(embedded_dir)
+    manifest = BootstrapManifest(embedded_dir / "manifest.json")
+
+    # Vectors stored before the index was split by access level are not searched until they are moved
+    try:
+        Groot.migrateNamespaces()
+    except Exception as e:
+        logging.error(f"Vector namespace migration failed: {str(e)}")
+
+    files = []
+    stores = _storePaths()
+    for name in sorted(os.listdir(dataset_dir)):
+        path = dataset_dir / name
+        if not path.is_file() or name.endswith(".json") or name.startswith(".") or _isStoreFile(path, stores):
+            continue
+        # Check if we have read permission on the source file
+        if not os.access(path, os.R_OK):
+            logging.error(f"No read permission for file: {name}")
+            continue
+        files.append(path)
+
+    # Check if we have write permission on the target directory
+    if files and not os.access(embedded_dir, os.W_OK):
+        logging.error(f"No write permission for directory: {embedded_dir}")
+        return bootstrapStatus
+
+    with _status_lock:
+        bootstrapStatus.update(running=True, total=len(files), done=0, failed=0, skipped=0,
+                               chunks=0, chunks_per_sec=0.0, current=[])
+    logging.info(f"Files to process: {len(files)}")
+    started = time.perf_counter()
+
+    pending = []
+    for path in files:
+        if manifest.is_done(path):
+            # Ingested before an interrupted run could move it
+            _moveToEmbedded(path, embedded_dir)
+            with _status_lock:
+                bootstrapStatus["skipped"] += 1
+            logging.info(f"Already ingested, moved: {path.name}")
+        else:
+            pending.append(path)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, chunk_workers)) as chunk_pool, \
+                ThreadPoolExecutor(max_workers=max(1, embed_workers)) as embed_pool:
+            embed_futures = []
+            chunk_futures = {}
+            for path in pending:
+                if path.stat().st_size > stream_threshold:
+                    embed_futures.append(embed_pool.submit(_ingest, path, None, unrestricted, embedded_dir, manifest, started))
+                else:
+                    future = chunk_pool.submit(chunkFile, str(path), Groot.chunk_max_tokens, Groot.chunk_overlap_tokens)
+                    chunk_futures[future] = path
+
+            for future in as_completed(chunk_futures):
+                path = chunk_futures[future]
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    logging.error(f"Error chunking file {path.name}: {str(e)}")
+                    manifest.mark(path, "failed", error=str(e))
+                    _reportProgress(path, 0, True, started)
+                    continue
+                embed_futures.append(embed_pool.submit(_ingest, path, chunks, unrestricted, embedded_dir, manifest, started))
+
+            for future in as_completed(embed_futures):
+                future.result()
+
+    with _status_lock:
+        bootstrapStatus["running"] = False
+    logging.info(
+        f"Bootstrap finished: {bootstrapStatus['done']} ingested, {bootstrapStatus['skipped']} skipped, "
+        f"{bootstrapStatus['failed']} failed in {time.perf_counter() - started:.1f}s"
+    )
+    return bootstrapStatus
+
+
+def startBootstrap(dataset_dir: Path, embedded_dir: Path, unrestricted: bool = True) -> threading.Thread:
+    """Run bootstrapDataset in a daemon thread so the UI can launch while files ingest"""
+    thread = threading.Thread(
+        target=bootstrapDataset, args=(dataset_dir, embedded_dir, unrestricted),
+        name="groot-bootstrap", daemon=True
+    )
+    thread.start()
+    return thread
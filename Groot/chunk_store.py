@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def chunkID(file: str, seq: int) -> str:
+    return f"{file}_chunk_{seq}"
+
+
+def splitChunkID(chunk_id: str) -> Tuple[str, int]:
+    """Split '{file}_chunk_{seq}' into (file, seq); seq is 0 when it cannot be parsed"""
+    file, _, seq = chunk_id.rpartition("_chunk_")
+    return (file, int(seq)) if file and seq.isdigit() else (chunk_id, 0)
+
+
+class ChunkStore:
+    """Indexed on-disk store of chunk texts, backed by SQLite.
+
+    Lookups by chunk ID and per-file queries go through indexes, writes only
+    touch the rows they change, and the database is opened on first use so
+    nothing is loaded at import time. If the store is empty and a legacy
+    SourceMapping.json exists, it is imported once, with every chunk marked
+    restricted since the JSON records no access level.
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with self._lock held
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id TEXT PRIMARY KEY,
+                    file TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    restricted INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_file_seq ON chunks (file, seq)")
+            conn.commit()
+            self._conn = conn
+            self._importLegacy()
+            logging.info(f"Chunk store opened: {self.path}")
+        return self._conn
+
+    def open(self) -> None:
+        """Open the database now instead of on first use"""
+        with self._lock:
+            self._connection()
+
+    def _importLegacy(self) -> None:
+        if not self.legacy_path or not Path(self.legacy_path).exists():
+            return
+        if self._conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone():
+            return
+        try:
+            with open(self.legacy_path, "r") as f:
+                mapping = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not import legacy source mapping: {str(e)}")
+            return
+        # The JSON mapping records no access level, so imported chunks are restricted until shown otherwise
+        rows = [(chunk_id, *splitChunkID(chunk_id), text, 1) for chunk_id, text in mapping.items()]
+        self._conn.executemany("INSERT OR REPLACE INTO chunks (id, file, seq, text, restricted) VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+        logging.info(f"Imported {len(rows)} chunks from {self.legacy_path}")
+
+    def get(self, chunk_id: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT text FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        return row[0] if row else default
+
+    def get_many(self, chunk_ids: Sequence[str]) -> List[Optional[str]]:
+        """Return the texts for chunk_ids in the same order, with None for unknown IDs"""
+        if not chunk_ids:
+            return []
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(chunk_ids))
+            for start in range(0, len(unique), 500):
+                part = unique[start:start+500]
+                rows = conn.execute(
+                    f"SELECT id, text FROM chunks WHERE id IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+        return [found.get(chunk_id) for chunk_id in chunk_ids]
+
+    def restricted_many(self, chunk_ids: Sequence[str]) -> Dict[str, bool]:
+        """Restricted flag of each stored chunk among chunk_ids; unknown IDs are left out"""
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(chunk_ids))
+            for start in range(0, len(unique), 500):
+                part = unique[start:start+500]
+                rows = conn.execute(
+                    f"SELECT id, restricted FROM chunks WHERE id IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update((chunk_id, bool(restricted)) for chunk_id, restricted in rows)
+        return found
+
+    def __getitem__(self, chunk_id: str) -> str:
+        text = self.get(chunk_id)
+        if text is None:
+            raise KeyError(chunk_id)
+        return text
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return isinstance(chunk_id, str) and self.get(chunk_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def items(self, batch_size: int = 1000) -> Iterator[Tuple[str, str]]:
+        """Iterate over (chunk ID, text) pairs without loading the whole store"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT id, text FROM chunks WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+    def records(self, batch_size: int = 1000) -> Iterator[Tuple[str, str, bool]]:
+        """Iterate over (chunk ID, text, restricted) rows without loading the whole store"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT id, text, restricted FROM chunks WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for chunk_id, text, restricted in rows:
+                yield chunk_id, text, bool(restricted)
+            last = rows[-1][0]
+
+    def file_seqs(self, file: str) -> List[int]:
+        """Sequence numbers of the chunks stored for a file, in ascending order"""
+        with self._lock:
+            rows = self._connection().execute("SELECT seq FROM chunks WHERE file = ? ORDER BY seq", (file,)).fetchall()
+        return [row[0] for row in rows]
+
+    def put_many(self, file: str, start: int, chunks: Sequence[str], restricted: bool) -> None:
+        """Insert or overwrite the chunks of a file with sequence numbers start, start+1, ..."""
+        rows = [(chunkID(file, start + i), file, start + i, chunk, int(restricted)) for i, chunk in enumerate(chunks)]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO chunks (id, file, seq, text, restricted) VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+
+    def set_restricted(self, flags: Dict[str, bool]) -> None:
+        """Update the restricted flag of stored chunks"""
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("UPDATE chunks SET restricted = ? WHERE id = ?",
+                             [(int(restricted), chunk_id) for chunk_id, restricted in flags.items()])
+            conn.commit()
+
+    def delete(self, chunk_ids: Sequence[str]) -> None:
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(chunk_ids), 500):
+                part = list(chunk_ids[start:start+500])
+                conn.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(part))})", part)
+            conn.commit()
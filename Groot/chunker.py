@@ -0,0 +1,149 @@
+import re
+from typing import Iterator, List, TextIO, Tuple
+
+# Rough size of a token for English text; used to turn token budgets into characters
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n")
+
+
+def estimateTokens(text: str) -> int:
+    """Approximate the number of tokens in text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _iterParagraphs(stream: TextIO, limit: int, block_size: int) -> Iterator[Tuple[str, bool]]:
+    """Yield (paragraph, continued) pairs read block by block from stream.
+
+    A paragraph that grows past a few chunks without a blank line is cut at its
+    last sentence end, so memory stays bounded; the pieces after such a cut
+    are yielded with continued=True.
+    """
+    buffer = ""
+    continued = False
+    max_buffer = max(4 * limit, block_size)
+
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        buffer += block
+
+        parts = _PARAGRAPH_BREAK.split(buffer)
+        buffer = parts.pop()  # The last part may continue in the next block
+        for part in parts:
+            if part.strip():
+                yield part.strip(), continued
+            continued = False
+
+        if len(buffer) > max_buffer:
+            cut = 0
+            for match in _SENTENCE_BREAK.finditer(buffer, 0, len(buffer) - limit):
+                cut = match.end()
+            if not cut:
+                cut = buffer.rfind(" ", 0, len(buffer) - limit) + 1 or len(buffer) - limit
+            if buffer[:cut].strip():
+                yield buffer[:cut].strip(), continued
+                continued = True
+            buffer = buffer[cut:]
+
+    if buffer.strip():
+        yield buffer.strip(), continued
+
+
+def _iterSentences(paragraph: str, limit: int) -> Iterator[str]:
+    """Yield the sentences of a paragraph, splitting any longer than limit at word boundaries"""
+    for sentence in _SENTENCE_BREAK.split(paragraph):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= limit:
+            yield sentence
+            continue
+
+        piece = ""
+        for word in sentence.split(" "):
+            while len(word) > limit:
+                if piece:
+                    yield piece
+                    piece = ""
+                yield word[:limit]
+                word = word[limit:]
+            if piece and len(piece) + 1 + len(word) > limit:
+                yield piece
+                piece = word
+            else:
+                piece = f"{piece} {word}" if piece else word
+        if piece:
+            yield piece
+
+
+def _join(pieces: List[Tuple[str, str]]) -> str:
+    return pieces[0][1] + "".join(separator + text for separator, text in pieces[1:])
+
+
+def _length(pieces: List[Tuple[str, str]]) -> int:
+    return len(_join(pieces)) if pieces else 0
+
+
+def _tail(pieces: List[Tuple[str, str]], overlap: int) -> List[Tuple[str, str]]:
+    """Return the trailing sentences of pieces that fit within overlap characters"""
+    kept: List[Tuple[str, str]] = []
+    size = 0
+    for separator, text in reversed(pieces[1:]):
+        size += len(text) + (len(kept[0][0]) if kept else 0)
+        if size > overlap:
+            break
+        kept.insert(0, (separator, text))
+    return kept
+
+
+def iterChunks(stream: TextIO, max_tokens: int = 125, overlap_tokens: int = 16, block_size: int = 1 << 16) -> Iterator[str]:
+    """Split a text stream into chunks that respect paragraph and sentence boundaries.
+
+    Each chunk stays within max_tokens (estimated) and starts with up to
+    overlap_tokens of trailing sentences from the previous chunk. The stream
+    is read block by block, so the whole document is never held in memory.
+    """
+    limit = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap = max(0, min(overlap_tokens * CHARS_PER_TOKEN, limit // 2))
+
+    current: List[Tuple[str, str]] = []  # (separator, sentence) pairs
+    length = 0
+    has_new = False  # Whether current holds anything beyond the carried-over overlap
+
+    for paragraph, continued in _iterParagraphs(stream, limit, block_size):
+        # Prefer to end chunks at paragraph boundaries once they are reasonably full
+        if not continued and has_new and length >= limit // 2:
+            yield _join(current)
+            current = _tail(current, overlap)
+            length = _length(current)
+            has_new = False
+
+        breaker = " " if continued else "\n\n"
+        for sentence in _iterSentences(paragraph, limit):
+            separator = breaker if current else ""
+            if current and length + len(separator) + len(sentence) > limit:
+                if has_new:
+                    yield _join(current)
+                current = _tail(current, overlap)
+                length = _length(current)
+                has_new = False
+                if current and length + len(separator) + len(sentence) > limit:
+                    current, length = [], 0
+                separator = breaker if current else ""
+
+            current.append((separator, sentence))
+            length += len(separator) + len(sentence)
+            has_new = True
+            breaker = " "
+
+    if has_new:
+        yield _join(current)
+
+
+def chunkFile(path: str, max_tokens: int = 125, overlap_tokens: int = 16) -> List[str]:
+    """Read and chunk a whole text file. Module-level so it can run in a process pool."""
+    with open(path, "r", encoding="utf-8") as f:
+        return list(iterChunks(f, max_tokens=max_tokens, overlap_tokens=overlap_tokens))
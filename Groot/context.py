@@ -0,0 +1,78 @@
+import re
+from typing import Dict, FrozenSet, List, Sequence
+
+try:
+    from .chunker import CHARS_PER_TOKEN, estimateTokens
+    from .lexical_index import tokenize
+except ImportError:
+    from chunker import CHARS_PER_TOKEN, estimateTokens
+    from lexical_index import tokenize
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[tuple]:
+    """Word n-grams of a text, used to compare chunks for overlap"""
+    words = text.lower().split()
+    if len(words) <= size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i:i+size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def assembleContext(chunks: Sequence[str], prompt: str, token_budget: int = 1500, mmr_lambda: float = 0.7,
+                    duplicate_threshold: float = 0.8) -> List[str]:
+    """Pick the retrieved chunks to send to the model.
+
+    Chunks are expected in retrieval order. Exact and near duplicates (word
+    shingle Jaccard >= duplicate_threshold) are dropped, the rest are scored
+    by retrieval rank and coverage of the prompt's terms, ordered with
+    maximal marginal relevance so similar chunks do not crowd each other out,
+    and packed greedily until token_budget is used.
+    """
+    seen = set()
+    candidates = []
+    for chunk in chunks:
+        key = _WHITESPACE.sub(" ", chunk).strip().lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        chunk_shingles = shingles(key)
+        if any(jaccard(chunk_shingles, kept) >= duplicate_threshold for _, kept in candidates):
+            continue
+        candidates.append((chunk, chunk_shingles))
+    if not candidates:
+        return []
+
+    prompt_terms = set(tokenize(prompt))
+    relevance: Dict[int, float] = {}
+    for rank, (chunk, _) in enumerate(candidates):
+        coverage = len(prompt_terms & set(tokenize(chunk))) / len(prompt_terms) if prompt_terms else 0.0
+        relevance[rank] = 0.5 * (1 - rank / len(candidates)) + 0.5 * coverage
+
+    selected: List[str] = []
+    selected_shingles: List[FrozenSet] = []
+    remaining = set(relevance)
+    used = 0
+    while remaining:
+        best = max(remaining, key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * max(
+            (jaccard(candidates[i][1], other) for other in selected_shingles), default=0.0
+        ))
+        remaining.discard(best)
+        chunk = candidates[best][0]
+        tokens = estimateTokens(chunk)
+        if used + tokens > token_budget:
+            if not selected:
+                # Even the best chunk is over budget; keep as much of it as fits
+                selected.append(chunk[:token_budget * CHARS_PER_TOKEN])
+                used = token_budget
+            continue
+        selected.append(chunk)
+        selected_shingles.append(candidates[best][1])
+        used += tokens
+    return selected
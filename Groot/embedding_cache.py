@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+
+class EmbeddingCache:
+    """Two-tier, content-addressed cache for embeddings.
+
+    Entries are keyed by a hash of (model name, text). Recently used vectors
+    live in an in-memory LRU of at most `max_entries` items, held as float32
+    arrays (4 bytes per value rather than a Python float object each) and
+    copied into a list only when returned; every vector is also written to an
+    SQLite file so the cache survives restarts. The file holds at most
+    `max_disk_entries` rows: once a write takes it past that, the oldest
+    written tenth is pruned.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_disk_entries: int = 200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._disk_entries = 0  # Upper bound: overwriting an existing key also counts as a new row
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with self._lock held
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+            self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logging.info(f"Embedding cache opened: {self.path}")
+        return self._conn
+
+    def open(self) -> None:
+        """Open the database now instead of on first use"""
+        with self._lock:
+            self._connection()
+
+    def _remember(self, key: str, vector: array) -> None:
+        # Called with self._lock held
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, or None"""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return cached embeddings for texts in order, with None for every miss"""
+        keys = [self.key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector.tolist()
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing:
+                try:
+                    conn = self._connection()
+                    pending = list(missing)
+                    # Stay well below SQLite's bound-parameter limit
+                    for start in range(0, len(pending), 500):
+                        part = pending[start:start+500]
+                        rows = conn.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                            part
+                        ).fetchall()
+                        for key, blob in rows:
+                            vector = array("f", blob)
+                            self._remember(key, vector)
+                            for i in missing.pop(key):
+                                results[i] = vector.tolist()
+                                self.disk_hits += 1
+                except sqlite3.Error as e:
+                    logging.warning(f"Embedding cache read failed: {str(e)}")
+
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        return results
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        self.put_many(model, [text], [vector])
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        """Store embeddings for texts in both tiers"""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.key(model, text)
+                vector = array("f", vector)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            try:
+                conn = self._connection()
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._disk_entries += len(rows)
+                if self._disk_entries > self.max_disk_entries:
+                    self._prune(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Embedding cache write failed: {str(e)}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        # Called with self._lock held. A replaced key gets a new rowid, so rowid order is write order
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_disk_entries * 9 // 10
+        if count > self.max_disk_entries and excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                (excess,)
+            )
+            count -= excess
+            logging.info(f"Embedding cache pruned {excess} oldest entries")
+        self._disk_entries = count
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for both tiers"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
@@ -0,0 +1,165 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a job would push more files into the queue than it can hold"""
+
+
+class _FileTask:
+    __slots__ = ("job", "path", "name", "size", "status", "chunks", "error", "started", "finished", "cleanup")
+
+    def __init__(self, job: "IngestJob", path: Path, cleanup: bool):
+        self.job = job
+        self.path = path
+        self.name = path.name
+        self.size = path.stat().st_size if path.exists() else 0
+        self.status = "queued"
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cleanup = cleanup
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        return {
+            "file": self.name,
+            "bytes": self.size,
+            "status": self.status,
+            "chunks": self.chunks,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(self.chunks / elapsed, 1) if elapsed > 0 else 0.0,
+            "error": self.error,
+        }
+
+
+class IngestJob:
+    def __init__(self, unrestricted: bool, mode: str):
+        self.id = uuid.uuid4().hex
+        self.unrestricted = unrestricted
+        self.mode = mode
+        self.created = time.time()
+        self.files: List[_FileTask] = []
+
+    @property
+    def status(self) -> str:
+        states = {task.status for task in self.files}
+        if states <= {"queued"}:
+            return "queued"
+        if states & {"queued", "running"}:
+            return "running"
+        if states == {"done"}:
+            return "done"
+        return "failed" if states == {"failed"} else "partial"
+
+    def to_dict(self) -> Dict[str, Any]:
+        files = [task.to_dict() for task in self.files]
+        started = [task.started for task in self.files if task.started]
+        finished = [task.finished for task in self.files if task.finished]
+        done = self.status in ("done", "failed", "partial")
+        elapsed = ((max(finished) if done else time.time()) - min(started)) if started else 0.0
+        chunks = sum(task.chunks for task in self.files)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "unrestricted": self.unrestricted,
+            "created_at": self.created,
+            "files_total": len(files),
+            "files_done": sum(task.status == "done" for task in self.files),
+            "files_failed": sum(task.status == "failed" for task in self.files),
+            "chunks": chunks,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(chunks / elapsed, 1) if elapsed > 0 else 0.0,
+            "files": files,
+        }
+
+
+class JobManager:
+    """Background ingestion of file batches.
+
+    submit() registers a job and queues its files at once; `workers` threads
+    take files off a queue bounded to `max_pending` files and run
+    ingest(path, unrestricted, mode, progress). When the queue cannot take a
+    whole job, submit() raises QueueFullError so callers can push back.
+    The most recent `max_jobs` jobs are kept for status queries.
+    """
+
+    def __init__(self, ingest: Callable[..., int], workers: int = 2, max_pending: int = 100, max_jobs: int = 1000):
+        self.ingest = ingest
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self._queue: "queue.Queue[_FileTask]" = queue.Queue()
+        self._pending = 0
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _start(self) -> None:
+        # Called with self._lock held
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"groot-ingest-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, paths: List[Path], unrestricted: bool, mode: str = "replace", cleanup: bool = False) -> IngestJob:
+        """Queue files for ingestion; cleanup deletes each file (and its directory, once empty) after processing"""
+        job = IngestJob(unrestricted, mode)
+        job.files = [_FileTask(job, Path(path), cleanup) for path in paths]
+        with self._lock:
+            if self._pending + len(job.files) > self.max_pending:
+                raise QueueFullError(f"Ingestion queue is full ({self._pending} of {self.max_pending} files pending)")
+            self._pending += len(job.files)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            self._start()
+        for task in job.files:
+            self._queue.put(task)
+        logging.info(f"Ingestion job {job.id} queued with {len(job.files)} files")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending_files": self._pending, "max_pending": self.max_pending, "workers": self.workers}
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            task.status = "running"
+            task.started = time.time()
+
+            def progress(chunks: int, task: _FileTask = task) -> None:
+                task.chunks = chunks
+
+            try:
+                task.chunks = self.ingest(task.path, task.job.unrestricted, task.job.mode, progress=progress)
+                task.status = "done"
+            except Exception as e:
+                logging.error(f"Ingestion job {task.job.id} failed on {task.name}: {str(e)}")
+                task.error = str(e)
+                task.status = "failed"
+            finally:
+                task.finished = time.time()
+                with self._lock:
+                    self._pending -= 1
+                if task.cleanup:
+                    # Uploaded files live alone in a per-upload directory; remove both
+                    try:
+                        os.remove(task.path)
+                        os.rmdir(task.path.parent)
+                    except OSError:
+                        pass
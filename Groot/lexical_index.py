@@ -0,0 +1,133 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i in is it its me my of on or
+please show tell that the their there this to was what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric terms with common English stopwords removed"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocalRankFusion(rankings: Sequence[Sequence[str]], k: int = 60, top_k: Optional[int] = None) -> List[str]:
+    """Merge ranked ID lists; each list contributes 1 / (k + rank) for every ID it contains"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    fused = sorted(scores, key=lambda doc_id: -scores[doc_id])
+    return fused[:top_k] if top_k is not None else fused
+
+
+class LexicalIndex:
+    """In-memory BM25 inverted index over chunk texts.
+
+    The index is built on first use from `loader`, which yields
+    (chunk ID, text, restricted) rows, and is then kept current through
+    add() and remove(). Searches can be limited to unrestricted chunks.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, str, bool]]], k1: float = 1.5, b: float = 0.75):
+        self.loader = loader
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._restricted: Dict[str, bool] = {}
+        self._total_length = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _load(self) -> None:
+        # Called with self._lock held
+        if self._loaded:
+            return
+        start = time.perf_counter()
+        for doc_id, text, restricted in self.loader():
+            self._add(doc_id, text, restricted)
+        self._loaded = True
+        logging.info(f"Lexical index built: {len(self._lengths)} chunks, {len(self._postings)} terms "
+                     f"in {time.perf_counter() - start:.2f}s")
+
+    def _add(self, doc_id: str, text: str, restricted: bool) -> None:
+        # Called with self._lock held
+        self._remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, count in counts.items():
+            self._postings[term][doc_id] = count
+        self._terms[doc_id] = tuple(counts)
+        self._lengths[doc_id] = sum(counts.values())
+        self._restricted[doc_id] = restricted
+        self._total_length += self._lengths[doc_id]
+
+    def _remove(self, doc_id: str) -> None:
+        # Called with self._lock held
+        for term in self._terms.pop(doc_id, ()):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+        self._restricted.pop(doc_id, None)
+
+    def add(self, items: Iterable[Tuple[str, str]], restricted: bool) -> None:
+        """Index (chunk ID, text) pairs, replacing earlier texts with the same IDs"""
+        with self._lock:
+            # Before the first search the loader will pick these up from the store
+            if not self._loaded:
+                return
+            for doc_id, text in items:
+                self._add(doc_id, text, restricted)
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def search(self, query: str, top_k: int = 5, unrestricted: bool = False) -> Tuple[List[Tuple[str, float]], bool]:
+        """BM25 search; unrestricted mode only sees unrestricted chunks.
+
+        Returns the top (chunk ID, score) pairs and whether every query term
+        occurs in the best hit.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], False
+        with self._lock:
+            self._load()
+            count = len(self._lengths)
+            if not count:
+                return [], False
+            average_length = self._total_length / count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if unrestricted and self._restricted[doc_id]:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+            covers_query = bool(ranked) and all(ranked[0][0] in self._postings.get(term, ()) for term in terms)
+        return ranked, covers_query
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._lengths)
@@ -1,14 +1,12 @@
-import os
 import gradio as gr
-import time
 import Groot
 import sys
 #import webview
-import shutil
 import logging
 from colorama import Fore, Back, Style
 import threading
 from pathlib import Path
+from bootstrap import startBootstrap
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 unrestricted = False
@@ -25,10 +23,7 @@ def fileUpload(history, file, request: gr.Request):
     try:
         # Ensure the file path is properly handled
         file_path = Path(file.name)
-        with open(file_path, "r", encoding="utf-8") as f:
-            Data = f.read()
-        
-        Groot.processSample(Data, file_path.name, unrestricted)
+        Groot.ingestFile(file_path, unrestricted)
         history = history + [(None, f"File added to vector database: {file_path.name} as {'unrestricted' if unrestricted else 'restricted'}.")]
         logging.info(f"File uploaded and processed: {file_path.name}")
         return history
@@ -37,8 +32,8 @@ def fileUpload(history, file, request: gr.Request):
         history = history + [(None, f"Error processing file: {str(e)}")]
         return history
 
-def reset_chat():
-    Groot.reset_chat_history()
+def reset_chat(request: gr.Request):
+    Groot.reset_chat_history(request.session_hash)
     return [], "Chat history has been reset."
 
 with gr.Blocks(css=".gradio-container {max-width: 800px !important}") as demo:
@@ -63,22 +58,24 @@ with gr.Blocks(css=".gradio-container {max-width: 800px !important}") as demo:
         clear = gr.ClearButton([msg, chatbot], value="Clear Chat")
         reset = gr.Button("Reset Chat History")
     
-    def respond(prompt, chat_history):
+    def respond(prompt, chat_history, request: gr.Request):
         if prompt == "exit":
             sys.exit(0)
         try:
             similarChunks = Groot.queryDatabase(prompt, unrestricted)
             logging.info(f"Found {len(similarChunks)} similar chunks")
 
-            resp = Groot.generateResponse(True, similarChunks, prompt)
-            # print("resp = ", resp)
+            # Show the answer as it streams in
+            resp = ""
             chat_history.append((prompt, resp))
-            time.sleep(0.5)  # Reduced delay for better responsiveness
-            return "", chat_history
+            for piece in Groot.generateResponseStream(True, similarChunks, prompt, request.session_hash):
+                resp += piece
+                chat_history[-1] = (prompt, resp)
+                yield "", chat_history
         except Exception as e:
             logging.error(f"Error generating response: {str(e)}")
             chat_history.append((prompt, f"I encountered an error: {str(e)}"))
-            return "", chat_history
+            yield "", chat_history
     
     file_msg = btn.upload(fileUpload, [chatbot, btn], [chatbot], queue=False).then(
         trash, chatbot, chatbot
@@ -99,46 +96,9 @@ if __name__ == "__main__":
         dataset_dir.mkdir(mode=0o777, exist_ok=True)
         embedded_dir.mkdir(mode=0o777, exist_ok=True)
         
-        # Process existing files
-        files = [f for f in os.listdir(dataset_dir) if (
-            os.path.isfile(dataset_dir / f) and 
-            not f.endswith(".json") and 
-            f != "Embedded" 
-        )]
-
-        print(files)
-        
-        if len(files) > 0:
-            logging.info(f"Files to process: {len(files)}")
-            for file in files:
-                try:
-                    file_path = dataset_dir / file
-                    target_path = embedded_dir / file
-                    
-                    # Check if we have read permission on the source file
-                    if not os.access(file_path, os.R_OK):
-                        logging.error(f"No read permission for file: {file}")
-                        continue
-                        
-                    # Check if we have write permission on the target directory
-                    if not os.access(embedded_dir, os.W_OK):
-                        logging.error(f"No write permission for directory: {embedded_dir}")
-                        break
-                    
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        Data = f.read()
-                    Groot.processSample(Data, file, True)
-                    
-                    # Use shutil.move with error handling
-                    if target_path.exists():
-                        target_path.unlink()  # Remove existing file if it exists
-                    shutil.move(str(file_path), str(target_path))
-                    logging.info(f"Processed and moved file: {file}")
-                    
-                except PermissionError as pe:
-                    logging.error(f"Permission error processing {file}: {str(pe)}")
-                except Exception as e:
-                    logging.error(f"Error processing file {file}: {str(e)}")
+        # Ingest existing files in the background (chunked in a process pool,
+        # embedded in a thread pool, checkpointed so a restart resumes) while the UI launches
+        startBootstrap(dataset_dir, embedded_dir, unrestricted=True)
                     
     except PermissionError as pe:
         logging.error(f"Permission error creating directories: {str(pe)}")
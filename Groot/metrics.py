@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Trace ID of the request being handled, set by the API middleware
+traceID: ContextVar[Optional[str]] = ContextVar("traceID", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def newTraceID() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class TraceIDFilter(logging.Filter):
+    """Adds the current trace ID (or '-') to log records as `trace_id`"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = traceID.get() or "-"
+        return True
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labelText(names: Sequence[str], values: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labelText(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, in the Prometheus layout"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labelText(self.labels, values, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labelText(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{_labelText(self.labels, values)} {cumulative}")
+        return lines
+
+
+stageLatency = Histogram("groot_stage_duration_seconds", "Time spent in each retrieval/generation stage", ["stage"])
+stageErrors = Counter("groot_stage_errors_total", "Stage calls that raised", ["stage"])
+requestLatency = Histogram("groot_http_request_duration_seconds", "API request latency", ["method", "path", "status"])
+
+_metrics = [stageLatency, stageErrors, requestLatency]
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block under `stage`, and count it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stageErrors.inc(stage)
+        raise
+    finally:
+        stageLatency.observe(time.perf_counter() - start, stage)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(line for metric in _metrics for line in metric.render()) + "\n"
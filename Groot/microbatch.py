@@ -0,0 +1,125 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generic, List, Sequence, TypeVar
+
+try:
+    from .metrics import traceID
+except ImportError:
+    from metrics import traceID
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces concurrent single-item calls into batched calls.
+
+    Items submitted within `max_wait_ms` of the first waiting item (or until
+    `max_batch` items are waiting) are passed together to `batch_fn`, which
+    must return one result per item in the same order. Each caller receives
+    its own result. If `batch_fn` raises for a batch of several items, each
+    item is retried in a batch of its own, so only the callers whose items
+    fail get an exception. Up to `max_in_flight` batches run at once, so a slow batch
+    does not hold back the next one.
+
+    Each item keeps the context of the call that submitted it. A batch runs
+    with the trace IDs of all of its callers, comma-separated, so its log
+    lines can be found from any of the requests; an item retried alone runs
+    in its caller's own context.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[T]], Sequence[R]], max_batch: int = 32, max_wait_ms: float = 5,
+                 max_in_flight: int = 4, name: str = "microbatch"):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix=name)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.split_batches = 0
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True)
+                    self._thread.start()
+
+    def submit(self, item: T) -> "Future[R]":
+        """Queue an item for the next batch and return a future for its result"""
+        self._start()
+        future: "Future[R]" = Future()
+        self._queue.put((item, future, contextvars.copy_context()))
+        return future
+
+    def __call__(self, item: T) -> R:
+        return self.submit(item).result()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run, batch)
+
+    def _call(self, items: List[T]) -> Sequence[R]:
+        results = self.batch_fn(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} items")
+        return results
+
+    @staticmethod
+    def _context(batch: List[tuple]) -> contextvars.Context:
+        if len(batch) == 1:
+            return batch[0][2]
+        context = batch[0][2].copy()
+        trace_ids = dict.fromkeys(item_context.get(traceID) or "-" for _, _, item_context in batch)
+        context.run(traceID.set, ",".join(trace_ids))
+        return context
+
+    def _run(self, batch: List[tuple]) -> None:
+        self._context(batch).run(self._runIn, batch)
+
+    def _runIn(self, batch: List[tuple]) -> None:
+        # Called inside the batch's context
+        items = [item for item, _, _ in batch]
+        try:
+            results = self._call(items)
+        except Exception as e:
+            if len(batch) == 1:
+                logging.error(f"{self.name} item failed: {str(e)}")
+                batch[0][1].set_exception(e)
+                return
+            logging.warning(f"{self.name} batch of {len(items)} failed, retrying its items one at a time: {str(e)}")
+            with self._lock:
+                self.split_batches += 1
+            for entry in batch:
+                self._run([entry])
+            return
+        with self._lock:
+            self.batches += 1
+            self.items += len(items)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "split_batches": self.split_batches,
+            }
@@ -0,0 +1,196 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+
+def _isRetryable(error: Exception) -> bool:
+    """Client errors (4xx other than timeouts and rate limits) will not succeed on retry"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    for attribute in ("code", "status_code", "status"):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return not (400 <= code < 500) or code in (408, 429)
+    return True
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, name: str = "upstream"):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    logging.warning(f"{self.name} circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LatencyStats:
+    """Call counts plus latency percentiles over the most recent calls"""
+
+    def __init__(self, window: int = 1000):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            else:
+                self._samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, errors = self.calls, self.errors
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2) if samples else 0.0
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+class Provider:
+    """A shared upstream client with retries, circuit breaking and latency stats.
+
+    The client is built once by `factory` (on first use or by warmup()) and
+    reused. call() retries failures up to `retries` times with exponential
+    backoff and full jitter, never sleeping past `timeout` seconds from the
+    first attempt, and fails fast with CircuitOpenError while the breaker is open.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], retries: int = 3, timeout: float = 30,
+                 base_delay: float = 0.5, max_delay: float = 8.0, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.factory = factory
+        self.retries = max(1, retries)
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(name=name)
+        self.latency = LatencyStats()
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.factory()
+                    logging.info(f"{self.name} client initialized")
+        return self._client
+
+    def override(self, client: Any) -> None:
+        """Use a ready-made client, e.g. a local stand-in for tests and benchmarks"""
+        with self._lock:
+            self._client = client
+
+    def warmup(self) -> None:
+        self.client
+
+    def call(self, fn: Callable[[Any], T]) -> T:
+        """Run fn(client) with retries, backoff and circuit breaking"""
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+            start = time.perf_counter()
+            try:
+                result = fn(self.client)
+            except Exception as e:
+                self.latency.record(time.perf_counter() - start, error=True)
+                retryable = _isRetryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # The upstream answered; the request itself was bad
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if not retryable or attempt == self.retries - 1 or time.monotonic() + delay > deadline:
+                    logging.error(f"{self.name} call failed after {attempt + 1} attempts: {str(e)}")
+                    raise
+                logging.warning(f"{self.name} attempt {attempt + 1} failed, retrying in {delay:.2f}s: {str(e)}")
+                time.sleep(delay)
+                continue
+            self.latency.record(time.perf_counter() - start)
+            self.breaker.record_success()
+            return result
+
+    def stream(self, fn: Callable[[Any], Iterator[T]]) -> Iterator[T]:
+        """Iterate fn(client) under the circuit breaker; streams are not retried once started"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield from fn(self.client)
+        except Exception as e:
+            failed = True
+            self.latency.record(time.perf_counter() - start, error=True)
+            if _isRetryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            # Also runs when the consumer stops iterating early
+            if not failed:
+                self.latency.record(time.perf_counter() - start)
+                self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"circuit": self.breaker.state, **self.latency.snapshot()}
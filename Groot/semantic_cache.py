@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class SemanticCache:
+    """Answer cache looked up by embedding similarity.
+
+    A lookup returns the value stored for the most similar previous question
+    when its cosine similarity reaches `threshold`. Entries expire after
+    `ttl` seconds; once `max_entries` are stored the least recently used
+    entry is replaced.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, ttl: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._values: List[Any] = [None] * max_entries
+        self._expires = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalise(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the cached value for a similar enough question, or None"""
+        query = self._normalise(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is not None:
+                scores = np.where(self._expires > now, self._matrix @ query, -np.inf)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._last_used[best] = now
+                    self.hits += 1
+                    return self._values[best]
+            self.misses += 1
+            return None
+
+    def put(self, embedding: Sequence[float], value: Any) -> None:
+        vector = self._normalise(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            # Reuse an expired or empty slot first, otherwise the least recently used one
+            expired = np.flatnonzero(self._expires <= now)
+            slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+            self._matrix[slot] = vector
+            self._values[slot] = value
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+
+    def clear(self, *args: Any) -> None:
+        """Drop every entry; accepts and ignores arguments so it can be used as an ingest listener"""
+        with self._lock:
+            self._expires[:] = 0
+            self._values = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": int(np.count_nonzero(self._expires > time.monotonic())),
+            }
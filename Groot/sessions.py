@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+DEFAULT_SESSION = "default"
+
+
+class _Session:
+    __slots__ = ("messages", "last_used")
+
+    def __init__(self, max_messages: int):
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Conversation history per session ID.
+
+    Each session keeps its last `max_turns` user/assistant exchanges in a
+    ring buffer. Sessions idle for longer than `ttl` seconds are dropped, and
+    the least recently used ones are evicted once there are more than
+    `max_sessions`, which bounds the memory held by the store.
+    """
+
+    def __init__(self, system_prompt: str, max_turns: int = 4, max_sessions: int = 10000, ttl: float = 3600):
+        self.system_prompt = system_prompt
+        self.max_messages = 2 * max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Called with self._lock held; sessions are ordered from least to most recently used
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - session.last_used > self.ttl:
+                del self._sessions[session_id]
+            else:
+                break
+
+    def _session(self, session_id: str) -> _Session:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_messages)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            self._evict(now)
+            return session
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Add a message to a session; the oldest message drops out once the buffer is full"""
+        self._session(session_id).messages.append({"role": role, "content": content})
+
+    def messages(self, session_id: str) -> List[Dict[str, str]]:
+        """The system prompt followed by the session's recent messages"""
+        return [{"role": "system", "content": self.system_prompt}, *self._session(session_id).messages]
+
+    def reset(self, session_id: Optional[str] = None) -> None:
+        """Forget one session, or every session when session_id is None"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,66 @@
+"""Bootstrap against the local vector backend, with Gemini replaced by the benchmark fake.
+
+Run from the repository root:
+
+    python -m unittest discover -s Groot/tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+GROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(GROOT_DIR))
+sys.path.insert(0, str(GROOT_DIR / "benchmarks"))
+
+
+class BootstrapRestartTest(unittest.TestCase):
+    def setUp(self):
+        # Groot's stores default to paths under Dataset/, the directory bootstrap scans
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp(prefix="groot-bootstrap-")
+        os.chdir(self.root)
+        os.environ["VECTOR_BACKEND"] = "local"
+        self.dataset = Path("Dataset")
+        self.embedded = self.dataset / "Embedded"
+        self.embedded.mkdir(parents=True)
+
+        import Groot
+        from fakes import FakeGemini, corpus
+        self.Groot = Groot
+        Groot.geminiProvider.override(FakeGemini())
+        with Groot._vector_store_lock:
+            Groot._vector_store = None
+        for i in range(2):
+            (self.dataset / f"notes{i}.txt").write_text(corpus(20, seed=i), encoding="utf-8")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def restart(self):
+        # A fresh process would reopen the local index from disk
+        with self.Groot._vector_store_lock:
+            self.Groot._vector_store = None
+
+    def test_second_run_leaves_stores_alone(self):
+        from bootstrap import bootstrapDataset
+
+        first = dict(bootstrapDataset(self.dataset, self.embedded))
+        self.assertEqual((first["done"], first["failed"]), (2, 0))
+        stored = len(self.Groot.getVectorStore())
+        self.assertGreater(stored, 0)
+
+        self.restart()
+        second = dict(bootstrapDataset(self.dataset, self.embedded))
+        self.assertEqual((second["total"], second["failed"]), (0, 0))
+        self.assertEqual(sorted(os.listdir(self.embedded)), ["manifest.json", "notes0.txt", "notes1.txt"])
+
+        self.restart()
+        self.assertEqual(len(self.Groot.getVectorStore()), stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,461 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def mergeMatches(results: Sequence[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """Combine the matches of one query from several namespaces into a single top_k by score"""
+    return sorted((match for result in results for match in result), key=lambda match: match["score"], reverse=True)[:top_k]
+
+
+class VectorStore:
+    """Interface shared by the vector index backends.
+
+    Vectors are dicts with 'id', 'values' and 'metadata' keys, as accepted by
+    Pinecone's upsert. Queries return dicts with 'id', 'score' and 'metadata'.
+    Namespaces partition the index: every call works on one namespace ("" is
+    the default), and a query only scans the namespaces it names.
+    """
+
+    def ensure(self) -> None:
+        """Make sure the index exists and is ready"""
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        raise NotImplementedError
+
+    def delete(self, ids: Sequence[str], namespace: str = "") -> None:
+        raise NotImplementedError
+
+    def fetch(self, ids: Sequence[str], namespace: str = "") -> List[Dict[str, Any]]:
+        """Stored vectors for the ids found in the namespace"""
+        raise NotImplementedError
+
+    def namespace_sizes(self) -> Dict[str, int]:
+        """Number of vectors in each non-empty namespace"""
+        raise NotImplementedError
+
+    def query(self, vector: Sequence[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+              namespace: str = "") -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def query_many(self, vectors: Sequence[Sequence[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+                   namespace: str = "") -> List[List[Dict[str, Any]]]:
+        """Run several queries with the same filter; results are in the order of `vectors`"""
+        return [self.query(vector, top_k=top_k, filter=filter, namespace=namespace) for vector in vectors]
+
+    def query_namespaces(self, vectors: Sequence[Sequence[float]], namespaces: Sequence[str], top_k: int = 5,
+                         filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Run several queries across several namespaces, keeping the best top_k matches of each query"""
+        per_namespace = [self.query_many(vectors, top_k=top_k, filter=filter, namespace=namespace) for namespace in namespaces]
+        return [mergeMatches(results, top_k) for results in zip(*per_namespace)]
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone serverless index; every request goes through the shared provider's retries and circuit breaker"""
+
+    def __init__(self, provider, index_name: str, dimension: int, region: str, batch_size: int = 100, ready_timeout: int = 30,
+                 query_concurrency: int = 8):
+        self.provider = provider
+        self.index_name = index_name
+        self.dimension = dimension
+        self.region = region
+        self.batch_size = batch_size
+        self.ready_timeout = ready_timeout
+        self.query_concurrency = max(1, query_concurrency)
+        self._ready = False
+        self._index = None
+
+    def ensure(self) -> None:
+        """Create the index if it is missing and wait until it is ready"""
+        if self._ready:
+            return
+        from pinecone import ServerlessSpec
+
+        try:
+            if self.index_name not in self.provider.call(lambda client: client.list_indexes().names()):
+                self.provider.call(lambda client: client.create_index(
+                    name=self.index_name,
+                    dimension=self.dimension,
+                    metric='cosine',
+                    spec=ServerlessSpec(
+                        cloud='aws',
+                        region=self.region
+                    )
+                ))
+                logging.info(f"Created new Pinecone index: {self.index_name}")
+
+            # Poll readiness instead of sleeping for a fixed time
+            deadline = time.monotonic() + self.ready_timeout
+            while not self.provider.call(lambda client: client.describe_index(self.index_name).status["ready"]):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Pinecone index {self.index_name} not ready after {self.ready_timeout} seconds")
+                time.sleep(1)
+            self._ready = True
+        except Exception as e:
+            logging.error(f"Error managing Pinecone index: {str(e)}")
+            raise
+
+    def index(self):
+        if self._index is None:
+            self._index = self.provider.client.Index(self.index_name)
+        return self._index
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        index = self.index()
+        for i in range(0, len(vectors), self.batch_size):
+            batch = vectors[i:i+self.batch_size]
+            self.provider.call(lambda client: index.upsert(vectors=batch, namespace=namespace))
+
+    def delete(self, ids: Sequence[str], namespace: str = "") -> None:
+        index = self.index()
+        ids = list(ids)
+        for i in range(0, len(ids), self.batch_size):
+            batch = ids[i:i+self.batch_size]
+            self.provider.call(lambda client: index.delete(ids=batch, namespace=namespace))
+
+    def fetch(self, ids: Sequence[str], namespace: str = "") -> List[Dict[str, Any]]:
+        index = self.index()
+        ids = list(ids)
+        vectors = []
+        for i in range(0, len(ids), self.batch_size):
+            batch = ids[i:i+self.batch_size]
+            result = self.provider.call(lambda client: index.fetch(ids=batch, namespace=namespace))
+            vectors.extend(
+                {"id": vector.id, "values": list(vector.values), "metadata": vector.metadata or {}}
+                for vector in result.vectors.values()
+            )
+        return vectors
+
+    def namespace_sizes(self) -> Dict[str, int]:
+        index = self.index()
+        stats = self.provider.call(lambda client: index.describe_index_stats())
+        return {name: summary.vector_count for name, summary in (stats.namespaces or {}).items() if summary.vector_count}
+
+    def query(self, vector: Sequence[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+              namespace: str = "") -> List[Dict[str, Any]]:
+        index = self.index()
+        if filter:
+            result = self.provider.call(lambda client: index.query(vector=list(vector), filter=filter, top_k=top_k,
+                                                                   include_metadata=True, namespace=namespace))
+        else:
+            result = self.provider.call(lambda client: index.query(vector=list(vector), top_k=top_k,
+                                                                   include_metadata=True, namespace=namespace))
+        return [
+            {"id": match.get("id"), "score": match.get("score"), "metadata": match.get("metadata") or {}}
+            for match in result.get("matches", [])
+        ]
+
+    def query_many(self, vectors: Sequence[Sequence[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+                   namespace: str = "") -> List[List[Dict[str, Any]]]:
+        return self.query_namespaces(vectors, [namespace], top_k=top_k, filter=filter)
+
+    def query_namespaces(self, vectors: Sequence[Sequence[float]], namespaces: Sequence[str], top_k: int = 5,
+                         filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        # Pinecone has no multi-vector or multi-namespace query; issue every (vector, namespace) query concurrently over the shared client
+        calls = [(vector, namespace) for vector in vectors for namespace in namespaces]
+        if len(calls) <= 1:
+            results = [self.query(vector, top_k=top_k, filter=filter, namespace=namespace) for vector, namespace in calls]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(calls), self.query_concurrency)) as executor:
+                results = list(executor.map(lambda call: self.query(call[0], top_k=top_k, filter=filter, namespace=call[1]), calls))
+        if len(namespaces) == 1:
+            return results
+        return [mergeMatches(results[i:i+len(namespaces)], top_k) for i in range(0, len(results), len(namespaces))]
+
+
+def _matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Evaluate the subset of Pinecone's metadata filter language used here: equality, $eq, $ne and $in"""
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op not in ("$eq", "$ne", "$in"):
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        elif value != condition:
+            return False
+    return True
+
+
+class _LocalPartition:
+    """In-process cosine index over a memory-mapped float32 matrix.
+
+    Rows are L2-normalised on insert so a query is a single matrix-vector
+    product. The matrix lives in '{path}.npy' (opened with np.memmap and grown
+    by doubling, created on the first insert). ids/metadata are snapshotted
+    in '{path}.json' and every write since the snapshot is appended to the
+    journal '{path}.log' as one JSON line, so a write costs the size of the
+    change rather than of the whole index. The journal is folded into a new
+    snapshot once it holds more entries than the index has rows.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._matrix: Optional[np.ndarray] = None
+        self._count = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._masks: Dict[str, np.ndarray] = {}
+        self._journaled = 0
+
+    @property
+    def _data_path(self) -> str:
+        return f"{self.path}.npy"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.path}.json"
+
+    @property
+    def _journal_path(self) -> str:
+        return f"{self.path}.log"
+
+    def _load(self) -> None:
+        # Called with self._lock held
+        if self._loaded:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._data_path):
+            if os.path.exists(self._meta_path):
+                with open(self._meta_path, "r") as f:
+                    meta = json.load(f)
+                self._ids = meta["ids"]
+                self._metadata = meta["metadata"]
+                self._count = len(self._ids)
+                self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+            if os.path.exists(self._journal_path):
+                # Replaying the journal repeats the row moves the writes made, so rows match the matrix
+                with open(self._journal_path, "r") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        for chunk_id, metadata in entry.get("upsert", []):
+                            self._setRow(chunk_id, metadata)
+                        for chunk_id in entry.get("delete", []):
+                            self._removeRow(chunk_id)
+                        self._journaled += 1
+            self._matrix = np.load(self._data_path, mmap_mode="r+")
+            logging.info(f"Local vector index {self.path} loaded: {self._count} vectors")
+        self._loaded = True
+
+    def _grow(self, needed: int) -> None:
+        # Called with self._lock held
+        if self._matrix is None:
+            self._matrix = np.lib.format.open_memmap(self._data_path, mode="w+", dtype=np.float32,
+                                                     shape=(max(1024, needed), self.dimension))
+            return
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = np.array(self._matrix[:self._count])
+        del self._matrix
+        self._matrix = np.lib.format.open_memmap(self._data_path, mode="w+", dtype=np.float32, shape=(capacity, self.dimension))
+        self._matrix[:self._count] = old
+
+    def _setRow(self, chunk_id: str, metadata: Dict[str, Any]) -> int:
+        # Called with self._lock held; returns the row of chunk_id, appending one for a new id
+        row = self._rows.get(chunk_id)
+        if row is None:
+            row = self._count
+            self._count += 1
+            self._rows[chunk_id] = row
+            self._ids.append(chunk_id)
+            self._metadata.append(metadata)
+        else:
+            self._metadata[row] = metadata
+        return row
+
+    def _removeRow(self, chunk_id: str) -> Optional[int]:
+        # Called with self._lock held; moves the last row into the gap to keep rows dense
+        # and returns the removed row, or None if chunk_id was not stored
+        row = self._rows.pop(chunk_id, None)
+        if row is None:
+            return None
+        last = self._count - 1
+        if row != last:
+            self._ids[row] = self._ids[last]
+            self._metadata[row] = self._metadata[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        self._count -= 1
+        return row
+
+    def _persist(self, entry: Dict[str, Any]) -> None:
+        # Called with self._lock held
+        self._matrix.flush()
+        self._masks.clear()
+        if self._journaled >= max(1024, self._count):
+            self._snapshot()
+            return
+        with open(self._journal_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._journaled += 1
+
+    def _snapshot(self) -> None:
+        # Called with self._lock held
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"ids": self._ids, "metadata": self._metadata}, f)
+        os.replace(tmp_path, self._meta_path)
+        if os.path.exists(self._journal_path):
+            os.remove(self._journal_path)
+        self._journaled = 0
+
+    @staticmethod
+    def _normalise(values: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(values, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return values / norms
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        if not vectors:
+            return
+        values = self._normalise(np.asarray([vector["values"] for vector in vectors], dtype=np.float32))
+        with self._lock:
+            self._load()
+            self._grow(self._count + len(vectors))
+            entry = []
+            for vector, row_values in zip(vectors, values):
+                metadata = vector.get("metadata") or {}
+                row = self._setRow(vector["id"], metadata)
+                self._matrix[row] = row_values
+                entry.append([vector["id"], metadata])
+            self._persist({"upsert": entry})
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._load()
+            removed = []
+            for chunk_id in ids:
+                row = self._removeRow(chunk_id)
+                if row is None:
+                    continue
+                removed.append(chunk_id)
+                # The last row was moved into the gap; move its vector too
+                if row != self._count:
+                    self._matrix[row] = self._matrix[self._count]
+            if removed:
+                self._persist({"delete": removed})
+
+    def fetch(self, ids: Sequence[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            rows = [(chunk_id, self._rows[chunk_id]) for chunk_id in ids if chunk_id in self._rows]
+            return [
+                {"id": chunk_id, "values": self._matrix[row].tolist(), "metadata": self._metadata[row]}
+                for chunk_id, row in rows
+            ]
+
+    def _mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        # Called with self._lock held; masks are cached until the next write
+        key = json.dumps(filter, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter((_matches(metadata, filter) for metadata in self._metadata), dtype=bool, count=self._count)
+            self._masks[key] = mask
+        return mask
+
+    def query(self, vector: Sequence[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self.query_many([vector], top_k=top_k, filter=filter)[0]
+
+    def query_many(self, vectors: Sequence[Sequence[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        # All queries are scored with one matrix-matrix product
+        queries = self._normalise(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        with self._lock:
+            self._load()
+            if not self._count or not len(queries):
+                return [[] for _ in range(len(queries))]
+            scores = queries @ self._matrix[:self._count].T
+            if filter:
+                scores = np.where(self._mask(filter), scores, -np.inf)
+            k = min(top_k, self._count)
+            results = []
+            for row_scores in scores:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.argsort(-row_scores[top])]
+                results.append([
+                    {"id": self._ids[row], "score": float(row_scores[row]), "metadata": self._metadata[row]}
+                    for row in top if np.isfinite(row_scores[row])
+                ])
+            return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return self._count
+
+
+class LocalVectorStore(VectorStore):
+    """In-process cosine index with one partition per namespace.
+
+    The default namespace is stored at '{path}' and every other namespace at
+    '{path}-{namespace}', each as its own matrix, so a query only scores the
+    rows of the namespaces it names.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._partitions: Dict[str, _LocalPartition] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, namespace: str) -> _LocalPartition:
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            if partition is None:
+                path = f"{self.path}-{namespace}" if namespace else self.path
+                partition = self._partitions[namespace] = _LocalPartition(path, self.dimension)
+            return partition
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        self._partition(namespace).upsert(vectors)
+
+    def delete(self, ids: Sequence[str], namespace: str = "") -> None:
+        self._partition(namespace).delete(ids)
+
+    def fetch(self, ids: Sequence[str], namespace: str = "") -> List[Dict[str, Any]]:
+        return self._partition(namespace).fetch(ids)
+
+    def namespace_sizes(self) -> Dict[str, int]:
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path)
+        namespaces = {""} | set(self._partitions)
+        if os.path.isdir(directory):
+            namespaces.update(
+                name[len(prefix) + 1:-len(".npy")] for name in os.listdir(directory)
+                if name.startswith(f"{prefix}-") and name.endswith(".npy")
+            )
+        sizes = {namespace: len(self._partition(namespace)) for namespace in namespaces}
+        return {namespace: size for namespace, size in sizes.items() if size}
+
+    def query(self, vector: Sequence[float], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+              namespace: str = "") -> List[Dict[str, Any]]:
+        return self._partition(namespace).query(vector, top_k=top_k, filter=filter)
+
+    def query_many(self, vectors: Sequence[Sequence[float]], top_k: int = 5, filter: Optional[Dict[str, Any]] = None,
+                   namespace: str = "") -> List[List[Dict[str, Any]]]:
+        return self._partition(namespace).query_many(vectors, top_k=top_k, filter=filter)
+
+    def __len__(self) -> int:
+        return sum(self.namespace_sizes().values())
@@ -10,6 +10,7 @@ import nodemailer from 'nodemailer';
 dotenv.config();
 const traktApiKey = process.env.TRAKT_API_KEY;
 const fanartApiKey = process.env.FANART_API_KEY;
+const qrApiKey = process.env.QR_API_KEY || "default_qr_api_key_for_development";
 
 const traktBaseUrl = 'https://api.trakt.tv/movies';
 const fanartBaseUrl = 'https://webservice.fanart.tv/v3/movies';
@@ -186,6 +187,8 @@ app.post("/ticketsdetail", async (req, res) => {
                 timestamp: new Date().toISOString(),
                 // Add a title field for better identification
                 title: ticketTitle
+            }, {
+                headers: { "x-api-key": qrApiKey }
             });
 
             qrCodeBase64 = qrResponse.data.qr_code;
@@ -348,6 +351,8 @@ app.get("/ticket/:ticketId/qr", async (req, res) => {
                 price: ticket.price,
                 ticket_id: ticket.id.toString(),
                 user_id: ticket.user_id.toString()
+            }, {
+                headers: { "x-api-key": qrApiKey }
             });
 
             return res.json({
@@ -0,0 +1,70 @@
+"""Render time and payload size of each QR output format.
+
+Renders the same set of distinct ticket payloads in every format, bypassing
+the render cache, and prints one JSON line per format with the median and
+95th percentile render time, the body size served by /generate-qr-image and
+the size of the qr_code field in /generate-qr, each also relative to the
+default png path:
+
+    python bench_formats.py --tickets 200 --box-size 10 --border 4
+"""
+import argparse
+import json
+import statistics
+import time
+
+from qr_api import QR_FORMATS, TicketData, build_simple_text, qr_code_field, render_qr
+
+
+def payloads(count: int) -> list:
+    return [
+        build_simple_text(TicketData(
+            movie="Interstellar Re-Release", theater="CineVibe Downtown Screen 3",
+            seats=[f"{row}{seat}" for row in "GH" for seat in range(1, 1 + i % 4 + 1)],
+            date="2026-10-18", time="21:15", price="450", ticket_id=f"TCK-{i:08d}",
+        ))
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--box-size", type=int, default=10)
+    parser.add_argument("--border", type=int, default=4)
+    parser.add_argument("--formats", nargs="+", choices=list(QR_FORMATS), default=list(QR_FORMATS))
+    args = parser.parse_args()
+
+    texts = payloads(args.tickets)
+    # The uncached function, so every format pays for its full render
+    render = render_qr.__wrapped__
+    baseline = None
+    for format in ["png"] + [f for f in args.formats if f != "png"]:
+        timings, body_bytes, json_bytes = [], 0, 0
+        for text in texts:
+            start = time.perf_counter()
+            data = render(text, format, args.box_size, args.border)
+            timings.append(time.perf_counter() - start)
+            body_bytes += len(data)
+            json_bytes += len(json.dumps(qr_code_field(format, data)))
+        result = {
+            "benchmark": "qr_format",
+            "format": format,
+            "tickets": args.tickets,
+            "box_size": args.box_size,
+            "border": args.border,
+            "median_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1] * 1000, 3),
+            "image_bytes": body_bytes // len(texts),
+            "json_bytes": json_bytes // len(texts),
+        }
+        if baseline is None:
+            baseline = result
+        result["speedup_vs_png"] = round(baseline["median_ms"] / result["median_ms"], 2)
+        result["json_size_vs_png"] = round(result["json_bytes"] / baseline["json_bytes"], 2)
+        if format in args.formats:
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Query
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import qrcode
@@ -8,9 +8,84 @@ import base64
 import json
 import uvicorn
 import uuid
-from datetime import datetime
+import os
+import hashlib
+import hmac
+import binascii
+import secrets
+import asyncio
+import heapq
+import time
+import re
+import struct
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import List
 
-app = FastAPI(title="Ticket QR Code Generator")
+# Rendered QR images kept in memory, keyed by the encoded ticket text
+QR_CACHE_SIZE = int(os.environ.get("QR_CACHE_SIZE", "1024"))
+# Worker processes rendering batch requests, and the most tickets one batch may hold
+QR_RENDER_WORKERS = int(os.environ.get("QR_RENDER_WORKERS", str(os.cpu_count() or 2)))
+QR_BATCH_MAX = int(os.environ.get("QR_BATCH_MAX", "5000"))
+
+# Secret for the HMAC on ticket payloads; gates verifying the codes need the same key
+signing_key = os.environ.get("QR_SIGNING_KEY")
+if not signing_key:
+    print("Warning: QR_SIGNING_KEY is not set; using a random key, so codes will not verify after a restart")
+    signing_key = secrets.token_hex(32)
+payload_signer = hmac.new(signing_key.encode("utf-8"), digestmod=hashlib.sha256)
+
+PAYLOAD_PREFIX = "CV1:"
+SIGNATURE_BYTES = 16
+FIELD_SEPARATOR = "\x1f"
+TICKET_FIELDS = ("movie", "theater", "date", "time", "seats", "ticket_id")
+SERIAL_NAMESPACE = uuid.UUID("5b0c6a5e-3f1d-4c7e-9d2a-8e6f1b4c2a90")
+
+# Shared secret callers send in the x-api-key header to sign or verify tickets
+QR_API_KEY = os.environ.get("QR_API_KEY")
+if not QR_API_KEY:
+    print("Warning: QR_API_KEY is not set; using the development key")
+    QR_API_KEY = "default_qr_api_key_for_development"
+
+# Serials of scanned tickets with when each was first admitted and when it can be forgotten, oldest first.
+# A ticket is forgotten once its show date is over (tickets past that point verify as expired), or
+# QR_USED_TTL_HOURS after the scan when its date is not YYYY-MM-DD; QR_USED_MAX caps the set regardless.
+QR_USED_GRACE_HOURS = float(os.environ.get("QR_USED_GRACE_HOURS", "6"))  # Past midnight, for late shows
+QR_USED_TTL_HOURS = float(os.environ.get("QR_USED_TTL_HOURS", "24"))
+QR_USED_MAX = int(os.environ.get("QR_USED_MAX", "1000000"))
+used_tickets = OrderedDict()
+used_expiry = []  # Heap of (expiry, serial)
+verify_counts = {"ok": 0, "used": 0, "expired": 0, "invalid": 0}
+
+# Output formats and the media type each is served with
+QR_FORMATS = {
+    "png": "image/png",  # Drawn and encoded by PIL, as before
+    "png1": "image/png",  # 1-bit PNG written from the module matrix
+    "svg": "image/svg+xml",
+    "matrix": "application/json",  # Module rows for drawing on the client
+}
+
+# Started on the first batch request so single-ticket use never spawns processes
+render_pool = None
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global render_pool
+    if render_pool is None:
+        render_pool = ProcessPoolExecutor(max_workers=QR_RENDER_WORKERS)
+    return render_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if render_pool is not None:
+        render_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="Ticket QR Code Generator", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -33,78 +108,281 @@ class TicketData(BaseModel):
     timestamp: str = None
     title: str = None
 
+async def validate_api_key(x_api_key: str = Header(None, description="API Key for authentication")):
+    # Optional here so a missing key gets the same 401 as a wrong one, not a validation error
+    if x_api_key is None or not hmac.compare_digest(x_api_key.encode("utf-8"), QR_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return x_api_key
+
 @app.get("/")
 async def root():
-    return {"message": "Ticket QR Code Generator API is running"}
+    return {
+        "message": "Ticket QR Code Generator API is running",
+        "render_cache": render_cache_stats(),
+        "verify": {**verify_counts, "used_tickets": len(used_tickets)}
+    }
+
+def build_ticket_dict(ticket: TicketData, serial: uuid.UUID) -> dict:
+    """Ticket details returned alongside the QR code"""
+    ticket_dict = {
+        "movie": ticket.movie,
+        "theater": ticket.theater,
+        "seats": ticket.seats,
+        "date": ticket.date,
+        "time": ticket.time,
+        "price": ticket.price,
+        # The serial signed into the QR code, and when the code was generated
+        "qr_uuid": str(serial),
+        "generated_at": datetime.now().isoformat()
+    }
+
+    # Add optional fields if they exist
+    if ticket.ticket_id:
+        ticket_dict["ticket_id"] = ticket.ticket_id
+    if ticket.user_id:
+        ticket_dict["user_id"] = ticket.user_id
+    if ticket.timestamp:
+        ticket_dict["timestamp"] = ticket.timestamp
+    if ticket.title:
+        ticket_dict["title"] = ticket.title
+    return ticket_dict
+
+def validate_ticket(ticket: TicketData) -> None:
+    if not ticket.movie or not ticket.theater or not ticket.seats or not ticket.date or not ticket.time or not ticket.price:
+        raise HTTPException(status_code=400, detail="Missing required ticket information")
+
+def ticket_serial(ticket: TicketData) -> uuid.UUID:
+    """Serial signed into the QR code; stable per ticket so a re-sent ticket gets the same code.
+    Without a ticket_id it is derived from the show and seats, so one seat booking cannot be
+    downloaded as several codes that each pass the used-ticket check."""
+    if ticket.ticket_id:
+        return uuid.uuid5(SERIAL_NAMESPACE, ticket.ticket_id)
+    seats_text = ",".join([str(s) for s in ticket.seats])
+    fields = [ticket.movie, ticket.theater, ticket.date, ticket.time, seats_text]
+    return uuid.uuid5(SERIAL_NAMESPACE, FIELD_SEPARATOR.join(fields))
+
+def sign_payload(body: bytes) -> bytes:
+    signer = payload_signer.copy()
+    signer.update(body)
+    return signer.digest()[:SIGNATURE_BYTES]
+
+def build_simple_text(ticket: TicketData, serial: uuid.UUID = None) -> str:
+    """The signed ticket payload encoded in the QR code; the rendered image depends on nothing else"""
+    # Binary payload: 16-byte serial, then the ticket fields separated by \x1f, then the signature
+    seats_text = ",".join([str(s) for s in ticket.seats])
+    fields = [ticket.movie, ticket.theater, ticket.date, ticket.time, seats_text, ticket.ticket_id or ""]
+    body = (serial or ticket_serial(ticket)).bytes + FIELD_SEPARATOR.join(
+        field.replace(FIELD_SEPARATOR, " ") for field in fields
+    ).encode("utf-8")
+
+    # Unpadded base32 stays within the QR alphanumeric character set, which packs denser than bytes
+    return PAYLOAD_PREFIX + base64.b32encode(body + sign_payload(body)).decode("ascii").rstrip("=")
 
-@app.post("/generate-qr")
-async def generate_qr(ticket: TicketData):
+def decode_ticket(code: str):
+    """Check a scanned payload's signature; returns (serial, fields), or None when it is not a valid ticket"""
+    # Some scanners report alphanumeric QR content in lower case
+    if code[:len(PAYLOAD_PREFIX)].upper() != PAYLOAD_PREFIX:
+        return None
+    encoded = code[len(PAYLOAD_PREFIX):]
     try:
-        # Validate required fields
-        if not ticket.movie or not ticket.theater or not ticket.seats or not ticket.date or not ticket.time or not ticket.price:
-            raise HTTPException(status_code=400, detail="Missing required ticket information")
+        payload = base64.b32decode(encoded + "=" * (-len(encoded) % 8), casefold=True)
+    except (binascii.Error, ValueError):
+        return None
+    body, signature = payload[:-SIGNATURE_BYTES], payload[-SIGNATURE_BYTES:]
+    if len(body) < 16 or not hmac.compare_digest(sign_payload(body), signature):
+        return None
+    fields = body[16:].decode("utf-8").split(FIELD_SEPARATOR)
+    if len(fields) != len(TICKET_FIELDS):
+        return None
+    return str(uuid.UUID(bytes=body[:16])), fields
 
-        # Create a dictionary with ticket data
-        ticket_dict = {
-            "movie": ticket.movie,
-            "theater": ticket.theater,
-            "seats": ticket.seats,
-            "date": ticket.date,
-            "time": ticket.time,
-            "price": ticket.price,
-            # Add a unique identifier and timestamp for each QR code
-            "qr_uuid": str(uuid.uuid4()),
-            "generated_at": datetime.now().isoformat()
-        }
+@lru_cache(maxsize=1024)
+def ticket_expiry(date_text: str):
+    """When a ticket for a YYYY-MM-DD show date stops being valid, or None if the date is in another format"""
+    try:
+        show_day = datetime.strptime(date_text.strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+    return (show_day + timedelta(days=1, hours=QR_USED_GRACE_HOURS)).timestamp()
+
+def forget_used_tickets(now: float) -> None:
+    """Drop used tickets whose expiry has passed"""
+    while used_expiry and used_expiry[0][0] <= now:
+        expires, serial = heapq.heappop(used_expiry)
+        used = used_tickets.get(serial)
+        if used is not None and used[1] == expires:
+            del used_tickets[serial]
+
+def verify_code(code: str, consume: bool) -> dict:
+    """Verify one scanned code against its signature and the used-ticket set"""
+    decoded = decode_ticket(code.strip())
+    if decoded is None:
+        verify_counts["invalid"] += 1
+        return {"valid": False, "status": "invalid"}
+    serial, fields = decoded
+    ticket = dict(zip(TICKET_FIELDS, fields))
+    ticket["seats"] = ticket["seats"].split(",") if ticket["seats"] else []
+    ticket["qr_uuid"] = serial
+
+    now = time.time()
+    expires = ticket_expiry(ticket["date"])
+    if expires is not None and now > expires:
+        verify_counts["expired"] += 1
+        return {"valid": False, "status": "expired", "ticket": ticket}
+
+    forget_used_tickets(now)
+    used = used_tickets.get(serial)
+    if used is not None:
+        verify_counts["used"] += 1
+        return {"valid": False, "status": "used", "first_scanned_at": used[0], "ticket": ticket}
+    if consume:
+        expires = expires or now + QR_USED_TTL_HOURS * 3600
+        used_tickets[serial] = (datetime.now().isoformat(), expires)
+        heapq.heappush(used_expiry, (expires, serial))
+        while len(used_tickets) > QR_USED_MAX:
+            used_tickets.popitem(last=False)
+    verify_counts["ok"] += 1
+    return {"valid": True, "status": "ok", "ticket": ticket}
 
-        # Add optional fields if they exist
-        if ticket.ticket_id:
-            ticket_dict["ticket_id"] = ticket.ticket_id
-        if ticket.user_id:
-            ticket_dict["user_id"] = ticket.user_id
-        if ticket.timestamp:
-            ticket_dict["timestamp"] = ticket.timestamp
-        if ticket.title:
-            ticket_dict["title"] = ticket.title
-
-        # Convert to JSON string
-        ticket_json = json.dumps(ticket_dict)
-
-        # Generate QR code with higher error correction for better phone scanning
-        qr = qrcode.QRCode(
-            version=4,  # Higher version for more data capacity
-            error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction
-            box_size=10,
-            border=4,
-        )
-
-        # Create a simple text format that's easy to scan
-        movie_name = ticket.movie.replace(' ', '_')
-        seats_text = ",".join([str(s) for s in ticket.seats])
-
-        # Format: CINEVIBE-TICKET: Movie | Theater | Date | Time | Seats
-        simple_text = f"CINEVIBE-TICKET: {movie_name} | {ticket.theater} | {ticket.date} | {ticket.time} | {seats_text}"
-
-        # Add ticket ID if available
-        if ticket.ticket_id:
-            simple_text += f" | ID:{ticket.ticket_id}"
-
-        qr.add_data(simple_text)
-        qr.make(fit=True)
+def make_qr(simple_text: str, box_size: int = 10, border: int = 4) -> qrcode.QRCode:
+    # Generate QR code with higher error correction for better phone scanning
+    qr = qrcode.QRCode(
+        version=4,  # Higher version for more data capacity
+        error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(simple_text)
+    qr.make(fit=True)
+    return qr
 
+def qr_rows(simple_text: str) -> List[str]:
+    """The module matrix without the quiet zone, one string per row with '1' for dark modules"""
+    qr = make_qr(simple_text, border=0)
+    return ["".join("1" if module else "0" for module in row) for row in qr.modules]
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def write_png1(rows: List[str], box_size: int, border: int) -> bytes:
+    """1-bit grayscale PNG written straight from the module matrix"""
+    size = (len(rows) + 2 * border) * box_size
+    padding = -size % 8
+    # In 1-bit grayscale a set bit is white, so dark modules become 0 bits
+    quiet = "1" * (border * box_size)
+    blank = b"\x00" + int("1" * (size + padding), 2).to_bytes((size + padding) // 8, "big")
+    raw = [blank] * (border * box_size)
+    for row in rows:
+        bits = quiet + "".join(("0" if module == "1" else "1") * box_size for module in row) + quiet + "1" * padding
+        raw.extend([b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")] * box_size)
+    raw.extend([blank] * (border * box_size))
+    header = struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header)
+            + png_chunk(b"IDAT", zlib.compress(b"".join(raw))) + png_chunk(b"IEND", b""))
+
+def write_svg(rows: List[str], box_size: int, border: int) -> bytes:
+    """SVG drawing each row's runs of dark modules as strokes of one path"""
+    size = len(rows) + 2 * border
+    path = []
+    for y, row in enumerate(rows):
+        end = None
+        for run in re.finditer("1+", row):
+            if end is None:
+                path.append(f"M{run.start() + border} {y + border}.5h{len(run.group())}")
+            else:
+                # Relative moves keep the path short
+                path.append(f"m{run.start() - end} 0h{len(run.group())}")
+            end = run.end()
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size * box_size}" height="{size * box_size}" '
+            f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(path)}" stroke="#000"/></svg>').encode("utf-8")
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(simple_text: str, format: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+    """Render the QR code for simple_text in one of QR_FORMATS; results are cached by payload and options"""
+    if format == "png":
         # Create an image from the QR Code
-        img = qr.make_image(fill_color="black", back_color="white")
+        img = make_qr(simple_text, box_size, border).make_image(fill_color="black", back_color="white")
 
         # Save the image to a bytes buffer
         buffer = BytesIO()
         img.save(buffer, format="PNG")
-        buffer.seek(0)
+        return buffer.getvalue()
+
+    rows = qr_rows(simple_text)
+    if format == "png1":
+        return write_png1(rows, box_size, border)
+    if format == "svg":
+        return write_svg(rows, box_size, border)
+    return json.dumps({"border": border, "rows": rows}).encode("utf-8")
+
+def qr_code_field(format: str, data: bytes):
+    """How a rendered QR code is embedded in a JSON response"""
+    if format == "svg":
+        return data.decode("utf-8")
+    if format == "matrix":
+        return json.loads(data)
+    # Convert to base64 for easy embedding in HTML/JSON
+    return base64.b64encode(data).decode('utf-8')
+
+class RenderOptions:
+    """Output options shared by the generate endpoints, taken from the query string"""
+
+    def __init__(self,
+                 format: str = Query("png", description="png, png1, svg or matrix"),
+                 box_size: int = Query(10, ge=1, le=50),
+                 border: int = Query(4, ge=0, le=20)):
+        if format not in QR_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of: {', '.join(QR_FORMATS)}")
+        self.format = format
+        self.box_size = box_size
+        self.border = border
 
-        # Convert to base64 for easy embedding in HTML/JSON
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    def render(self, simple_text: str) -> bytes:
+        return render_qr(simple_text, self.format, self.box_size, self.border)
+
+def render_cache_stats() -> dict:
+    info = render_qr.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+def payload_etag(simple_text: str, options: RenderOptions) -> str:
+    """Strong ETag for the image of a payload, computed without rendering it"""
+    key = f"{options.format}|{options.box_size}|{options.border}|{simple_text}"
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return render_cache_stats()
+
+@app.post("/generate-qr", dependencies=[Depends(validate_api_key)])
+async def generate_qr(ticket: TicketData, options: RenderOptions = Depends()):
+    try:
+        # Validate required fields
+        validate_ticket(ticket)
+
+        # Create a dictionary with ticket data
+        serial = ticket_serial(ticket)
+        ticket_dict = build_ticket_dict(ticket, serial)
+
+        # Render (or reuse) the QR code for the ticket's payload
+        data = options.render(build_simple_text(ticket, serial))
 
         return {
-            "qr_code": img_str,
+            "qr_code": qr_code_field(options.format, data),
+            "format": options.format,
             "ticket_data": ticket_dict
         }
     except HTTPException as e:
@@ -114,71 +392,26 @@ async def generate_qr(ticket: TicketData):
         print(f"Error generating QR code: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating QR code: {str(e)}")
 
-@app.post("/generate-qr-image")
-async def generate_qr_image(ticket: TicketData):
+@app.post("/generate-qr-image", dependencies=[Depends(validate_api_key)])
+async def generate_qr_image(ticket: TicketData, options: RenderOptions = Depends(), if_none_match: str = Header(None)):
     try:
         # Validate required fields
-        if not ticket.movie or not ticket.theater or not ticket.seats or not ticket.date or not ticket.time or not ticket.price:
-            raise HTTPException(status_code=400, detail="Missing required ticket information")
-
-        # Create a dictionary with ticket data
-        ticket_dict = {
-            "movie": ticket.movie,
-            "theater": ticket.theater,
-            "seats": ticket.seats,
-            "date": ticket.date,
-            "time": ticket.time,
-            "price": ticket.price,
-            # Add a unique identifier and timestamp for each QR code
-            "qr_uuid": str(uuid.uuid4()),
-            "generated_at": datetime.now().isoformat()
-        }
+        validate_ticket(ticket)
 
-        # Add optional fields if they exist
-        if ticket.ticket_id:
-            ticket_dict["ticket_id"] = ticket.ticket_id
-        if ticket.user_id:
-            ticket_dict["user_id"] = ticket.user_id
-        if ticket.timestamp:
-            ticket_dict["timestamp"] = ticket.timestamp
-        if ticket.title:
-            ticket_dict["title"] = ticket.title
-
-        # Convert to JSON string
-        ticket_json = json.dumps(ticket_dict)
-
-        # Generate QR code with higher error correction for better phone scanning
-        qr = qrcode.QRCode(
-            version=4,  # Higher version for more data capacity
-            error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction
-            box_size=10,
-            border=4,
-        )
-
-        # Create a simple text format that's easy to scan
-        movie_name = ticket.movie.replace(' ', '_')
-        seats_text = ",".join([str(s) for s in ticket.seats])
-
-        # Format: CINEVIBE-TICKET: Movie | Theater | Date | Time | Seats
-        simple_text = f"CINEVIBE-TICKET: {movie_name} | {ticket.theater} | {ticket.date} | {ticket.time} | {seats_text}"
-
-        # Add ticket ID if available
-        if ticket.ticket_id:
-            simple_text += f" | ID:{ticket.ticket_id}"
-
-        qr.add_data(simple_text)
-        qr.make(fit=True)
+        simple_text = build_simple_text(ticket)
+        etag = payload_etag(simple_text, options)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
 
-        # Create an image from the QR Code
-        img = qr.make_image(fill_color="black", back_color="white")
+        # The client already holds this exact image
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
 
-        # Save the image to a bytes buffer
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
+        hits = render_qr.cache_info().hits
+        data = options.render(simple_text)
+        headers["X-Render-Cache"] = "hit" if render_qr.cache_info().hits > hits else "miss"
 
         # Return the image directly
-        return Response(content=buffer.getvalue(), media_type="image/png")
+        return Response(content=data, media_type=QR_FORMATS[options.format], headers=headers)
     except HTTPException as e:
         # Re-raise HTTP exceptions
         raise
@@ -186,5 +419,95 @@ async def generate_qr_image(ticket: TicketData):
         print(f"Error generating QR code image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating QR code: {str(e)}")
 
+def discard_render_pool(pool: ProcessPoolExecutor) -> None:
+    """Shut down a pool whose worker died, so the next render starts a fresh one"""
+    global render_pool
+    if render_pool is pool:
+        render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def submit_render(loop: asyncio.AbstractEventLoop, text: str, options: RenderOptions) -> asyncio.Future:
+    """Queue one render in the process pool, replacing the pool once if it is broken.
+    Never raises: a render that cannot be queued comes back as a failed future."""
+    error = None
+    for _ in range(2):
+        pool = get_render_pool()
+        try:
+            return loop.run_in_executor(pool, render_qr, text, options.format, options.box_size, options.border)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # Broken by a dead worker, or shut down by another request that found it broken
+            print(f"Render pool unavailable, starting a new one: {str(e)}")
+            discard_render_pool(pool)
+            error = e
+    future = loop.create_future()
+    future.set_exception(error)
+    return future
+
+async def batch_line(index: int, ticket: TicketData, serial: uuid.UUID, format: str, future: asyncio.Future) -> str:
+    try:
+        data = await future
+        line = {
+            "index": index,
+            "qr_code": qr_code_field(format, data),
+            "ticket_data": build_ticket_dict(ticket, serial)
+        }
+    except Exception as e:
+        print(f"Error generating QR code for ticket {index}: {str(e)}")
+        line = {"index": index, "error": f"Error generating QR code: {str(e)}"}
+    return json.dumps(line) + "\n"
+
+async def stream_qr_batch(tickets: List[TicketData], options: RenderOptions):
+    """Render tickets in the process pool and yield one NDJSON line per ticket, in request order"""
+    loop = asyncio.get_running_loop()
+    # Keep every worker busy without holding the whole batch's images in memory
+    window = deque()
+    try:
+        for index, ticket in enumerate(tickets):
+            serial = ticket_serial(ticket)
+            future = submit_render(loop, build_simple_text(ticket, serial), options)
+            window.append((index, ticket, serial, options.format, future))
+            if len(window) >= QR_RENDER_WORKERS * 4:
+                yield await batch_line(*window.popleft())
+        while window:
+            yield await batch_line(*window.popleft())
+    finally:
+        # The client went away; drop renders that have not started
+        for *_, future in window:
+            future.cancel()
+
+@app.post("/generate-qr/batch", dependencies=[Depends(validate_api_key)])
+async def generate_qr_batch(tickets: List[TicketData], options: RenderOptions = Depends()):
+    if not tickets:
+        raise HTTPException(status_code=400, detail="No tickets provided")
+    if len(tickets) > QR_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"A batch can hold at most {QR_BATCH_MAX} tickets")
+
+    # Validate everything before the response starts streaming
+    for index, ticket in enumerate(tickets):
+        try:
+            validate_ticket(ticket)
+        except HTTPException as e:
+            raise HTTPException(status_code=400, detail=f"{e.detail} (ticket {index})")
+
+    return StreamingResponse(stream_qr_batch(tickets, options), media_type="application/x-ndjson")
+
+class VerifyRequest(BaseModel):
+    code: str
+    consume: bool = True
+
+class VerifyBatchRequest(BaseModel):
+    codes: List[str]
+    consume: bool = True
+
+@app.post("/verify", dependencies=[Depends(validate_api_key)])
+async def verify(request: VerifyRequest):
+    return verify_code(request.code, request.consume)
+
+@app.post("/verify/batch", dependencies=[Depends(validate_api_key)])
+async def verify_batch(request: VerifyBatchRequest):
+    if len(request.codes) > QR_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"A batch can hold at most {QR_BATCH_MAX} codes")
+    return {"results": [verify_code(code, request.consume) for code in request.codes]}
+
 if __name__ == "__main__":
     uvicorn.run("qr_api:app", host="0.0.0.0", port=3002, reload=True)